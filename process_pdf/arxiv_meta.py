@@ -7,25 +7,226 @@
 @Author  ：wei liyu
 @Date    ：2025/10/16 22:45 
 '''
-import requests
-from bs4 import BeautifulSoup
+import os
 import re
 import logging
+import tempfile
+import itertools
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+import fitz  # PyMuPDF
+
+from pdf_meta import _extract_title_from_page
+from pdf_text import iter_pages_parallel
+from layout_cache import PageLayoutCache, _SPAN_FLAGS
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def extract_arxiv_paper_info(arxiv_url: str) -> dict:
+# ------------------ 本地 PyMuPDF 解析 ------------------
+
+_HEADING_RE = re.compile(
+    r"^(?:(?:\d+(?:\.\d+)*|[IVX]+|[A-Z])\.?\s+)?"
+    r"(abstract|introduction|related work|background|method|methods|methodology|experiments?|results|"
+    r"discussion|conclusions?|references|bibliography|acknowledg(?:e)?ments?|appendix)\b",
+    re.I)
+_NUMBERED_RE = re.compile(r"^(?:\d+(?:\.\d+)*|[IVX]+)\.?\s+[A-Z]")
+# 页边水印整行，如 "arXiv:2506.21611v2  [cs.CL]  27 Jun 2025"；正文 / 参考文献里提到的 arXiv ID 不算
+_WATERMARK_RE = re.compile(
+    r"arXiv:\s*(?:\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})v\d+\s*\[[\w.\-]+\]\s*\d{1,2}\s*[A-Z][a-z]{2}\s*\d{4}")
+
+
+def _page_lines(page: fitz.Page, layout: Optional[PageLayoutCache] = None) -> List[Dict[str, Any]]:
+    """按阅读顺序返回页面文本行：text / size（行内最大字号）/ bold。"""
+    if layout is not None:
+        return _lines_from_layout(layout.spans(page))
+    info = page.get_text("dict", flags=_SPAN_FLAGS, sort=True)
+    lines = []
+    for b in info.get("blocks", []):
+        if b.get("type", 0) != 0:
+            continue
+        for line in b.get("lines", []):
+            spans = [s for s in line.get("spans", []) if (s.get("text") or "").strip()]
+            if not spans:
+                continue
+            text = " ".join(s["text"].strip() for s in spans)
+            lines.append(dict(text=text,
+                              size=max(s.get("size", 0) for s in spans),
+                              bold=all(s.get("flags", 0) & 16 for s in spans)))
+    return lines
+
+
+def _lines_from_layout(spans) -> List[Dict[str, Any]]:
+    """由版面缓存的 span（带行序号）还原文本行。"""
+    lines = []
+    for _, group in itertools.groupby(spans, key=lambda sp: sp[0]):
+        group = [sp for sp in group if sp[7].strip()]
+        if group:
+            lines.append(dict(text=" ".join(sp[7].strip() for sp in group),
+                              size=max(sp[1] for sp in group),
+                              bold=all(sp[6] & 16 for sp in group)))
+    return lines
+
+
+def _body_size(lines: List[Dict[str, Any]]) -> float:
+    """正文字号：按字符数加权的众数。"""
+    cnt = Counter()
+    for l in lines:
+        cnt[round(l["size"], 1)] += len(l["text"])
+    return cnt.most_common(1)[0][0] if cnt else 0.0
+
+
+def _is_heading(line: Dict[str, Any], body: float) -> bool:
+    t = line["text"]
+    if len(t) > 80 or (t.endswith((".", ",", ";")) and not _HEADING_RE.match(t)):
+        return False
+    if _HEADING_RE.match(t) and (line["bold"] or line["size"] > body * 1.05 or len(t) < 40):
+        return True
+    return _NUMBERED_RE.match(t) is not None and (line["bold"] or line["size"] > body * 1.15)
+
+
+def _segment_page(pno: int, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按版面把一页切成若干节：sections = [{"heading": 标题或 None（接上一页）, "text": ...}]
+    页眉页脚里的 arXiv 水印与页码被去掉。
+    """
+    body = _body_size(lines)
+    sections = [{"heading": None, "text": []}]
+    for l in lines:
+        t = l["text"]
+        if _WATERMARK_RE.fullmatch(t) or re.fullmatch(r"\d{1,4}", t):
+            continue
+        if _is_heading(l, body):
+            sections.append({"heading": t, "text": []})
+        else:
+            sections[-1]["text"].append(t)
+    sections = [{"heading": sec["heading"], "text": _join_lines(sec["text"])} for sec in sections
+                if sec["heading"] or sec["text"]]
+    return {"page": pno, "sections": sections,
+            "text": "\n".join(((sec["heading"] + "\n") if sec["heading"] else "") + sec["text"]
+                              for sec in sections)}
+
+
+def _join_lines(lines: List[str]) -> str:
+    """合并为段落文本，处理行尾连字符断词。"""
+    out = ""
+    for t in lines:
+        if out.endswith("-") and t[:1].islower():
+            out = out[:-1] + t
+        else:
+            out = (out + " " + t) if out else t
+    return out
+
+
+def _segment_doc_page(page: fitz.Page) -> Dict[str, Any]:
+    return _segment_page(page.number, _page_lines(page))
+
+
+def iter_pdf_pages(pdf_path: str, workers: int = 1, start: int = 0,
+                   use_layout_cache: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    逐页产出 {"page", "sections", "text"}，不把全文拼成一个大字符串。
+    workers > 1 时按页分块交给多个进程并行解析（见 pdf_text.iter_pages_parallel），顺序不变。
+    use_layout_cache: 顺序解析时读写 PDF 旁的逐页版面缓存（并行模式不使用，避免多进程同写一个文件）
+    """
+    if use_layout_cache and workers <= 1:
+        return _iter_pages_cached(pdf_path, start)
+    return iter_pages_parallel(pdf_path, _segment_doc_page, workers=workers, start=start)
+
+
+def _iter_pages_cached(pdf_path: str, start: int) -> Iterator[Dict[str, Any]]:
+    with PageLayoutCache(pdf_path) as layout, fitz.open(pdf_path) as doc:
+        for pno in range(start, len(doc)):
+            page = doc[pno]
+            yield _segment_page(pno, _page_lines(page, layout))
+
+
+def _abstract_from_page(page_info: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not page_info:
+        return None
+    for sec in page_info["sections"]:
+        h = sec["heading"] or ""
+        if re.match(r"^(?:\W*)abstract\b", h, re.I):
+            rest = re.sub(r"^\W*abstract\W*", "", h, flags=re.I)
+            return (rest + " " + sec["text"]).strip()
+    # 摘要标题与正文在同一行：如 "Abstract—We propose ..."
+    m = re.search(r"\babstract\b\W*(.+)", page_info["text"], re.I | re.S)
+    if m:
+        return m.group(1).split("\n")[0].strip()
+    return None
+
+
+def extract_local_paper_info(pdf_path: str, workers: int = 1, use_layout_cache: bool = False) -> dict:
+    """
+    纯本地解析（离线）：标题、摘要与逐页正文。
+
+    参数:
+    workers (int): 逐页解析的进程数，几百页的长文档可设为 CPU 核数
+    use_layout_cache (bool): 读写 PDF 旁的逐页版面缓存，重复解析同一文件时不再做版面分析
+
+    返回:
+    dict: {'title', 'abstract', 'pages'}，pages 为逐页生成器（见 iter_pdf_pages）
+    """
+    with fitz.open(pdf_path) as doc:
+        if not len(doc):
+            return {'title': None, 'abstract': None, 'pages': iter(())}
+        if use_layout_cache:
+            with PageLayoutCache(pdf_path) as layout:
+                title = _extract_title_from_page(doc[0], layout)
+                first = _segment_page(0, _page_lines(doc[0], layout))
+        else:
+            title = _extract_title_from_page(doc[0])
+            first = _segment_doc_page(doc[0])
+    rest = iter_pdf_pages(pdf_path, workers=workers, start=1, use_layout_cache=use_layout_cache)
+    return {
+        'title': title,
+        'abstract': _abstract_from_page(first),
+        'pages': itertools.chain([first], rest),
+    }
+
+
+def _download_pdf(pdf_url: str, cache_dir: Optional[str] = None) -> Optional[str]:
+    """下载 arXiv PDF 到本地缓存目录，已存在则直接复用。"""
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "arxiv_pdf")
+    os.makedirs(cache_dir, exist_ok=True)
+    name = re.sub(r"[^\w.\-]", "_", pdf_url.split("arxiv.org/")[-1])
+    if not name.endswith(".pdf"):
+        name += ".pdf"
+    path = os.path.join(cache_dir, name)
+    if os.path.exists(path):
+        return path
+    try:
+        response = requests.get(pdf_url, timeout=30)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error downloading paper: {e}")
+        return None
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp, path)
+    return path
+
+
+def extract_arxiv_paper_info(arxiv_url: str, engine: str = "jina", cache_dir: Optional[str] = None,
+                             workers: int = 1, use_layout_cache: bool = False) -> dict:
     """
     从 arXiv 论文 URL 解析论文信息
 
     参数:
     arxiv_url (str): arXiv 论文的 URL，例如 https://arxiv.org/abs/2305.12345
+    engine (str): "jina" 使用远程 r.jina.ai 解析；"local" 下载 PDF 后用 PyMuPDF 本地解析
+    cache_dir (str): local 模式下 PDF 的缓存目录，默认系统临时目录
+    workers (int): local 模式下逐页解析的进程数
+    use_layout_cache (bool): local 模式下读写 PDF 旁的逐页版面缓存
 
     返回:
-    dict: 包含论文标题、摘要和正文的字典
+    dict: 包含论文标题、摘要和正文的字典；local 模式下正文为逐页生成器 'pages'
     """
     # 确保 URL 是有效的 arXiv URL
     if "arxiv.org" not in arxiv_url:
@@ -38,6 +239,12 @@ def extract_arxiv_paper_info(arxiv_url: str) -> dict:
     else:
         pdf_url = arxiv_url
 
+    if engine == "local":
+        pdf_path = _download_pdf(pdf_url, cache_dir)
+        if not pdf_path:
+            return None
+        return extract_local_paper_info(pdf_path, workers=workers, use_layout_cache=use_layout_cache)
+
     # 使用 Jina AI Reader 解析 PDF
     reader_url = f"https://r.jina.ai/{pdf_url}"
 
@@ -110,7 +317,16 @@ def print_paper_summary(paper_info: dict):
     print(f"摘要: {paper_info['abstract']}")
 
     print("\n正文摘要 (前500字符):")
-    print(paper_info['content'][:500] + "..." if len(paper_info['content']) > 500 else paper_info['content'])
+    if 'pages' in paper_info:
+        # 逐页生成器：只取够 500 字符即可
+        content = ""
+        for page in paper_info['pages']:
+            content += page['text'] + "\n"
+            if len(content) > 500:
+                break
+    else:
+        content = paper_info['content']
+    print(content[:500] + "..." if len(content) > 500 else content)
 
 
 if __name__ == "__main__":
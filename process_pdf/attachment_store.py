@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：attachment_store.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/20 16:40
+'''
+"""
+按内容寻址的附件库：文件以全文件 blake2b 命名存放，同样的字节只存一份。
+
+    <root>/objects/ab/cdef....pdf   附件本体（哈希前两位分目录）
+    <root>/index.mrc                索引（MetaCache），"blob:<hash>" -> {"meta", "names", "size", "ts"}
+
+导入前先算哈希查索引：已入库的文件直接复用已有的元数据记录，不再做线索提取和联网解析。
+只有解析成功的元数据才会复用；未解析（如断网时导入）的记录视为未命中，下次导入会重试。
+
+用法：
+    with AttachmentStore("D:/library") as store:
+        h, rec = store.lookup("paper (1).pdf")
+        if rec is None:
+            res = extract_and_fetch("paper (1).pdf")
+            store.add("paper (1).pdf", res, h)
+"""
+import os
+import time
+import shutil
+from dataclasses import asdict, fields, replace
+from typing import Any, Dict, Optional, Tuple
+
+from file_hash import full_hash
+from meta_cache import MetaCache
+from pdf_meta import MetaResult
+
+_META_FIELDS = [f.name for f in fields(MetaResult) if f.name != "pdf_path"]
+
+
+class AttachmentStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        os.makedirs(self.objects, exist_ok=True)
+        self.index = MetaCache(os.path.join(root, "index.mrc"))
+
+    def blob_path(self, h: str) -> str:
+        return os.path.join(self.objects, h[:2], h[2:] + ".pdf")
+
+    def lookup(self, path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """返回 (文件哈希, 索引记录)；未入库时记录为 None。"""
+        h = full_hash(path)
+        return h, self.record(h)
+
+    def record(self, h: str) -> Optional[Dict[str, Any]]:
+        return self.index.get("blob:" + h)
+
+    def result(self, path: str, rec: Dict[str, Any]) -> Optional[MetaResult]:
+        """把索引里的元数据还原成以 path 为路径的 MetaResult；没有解析成功的元数据时返回 None。"""
+        meta = rec.get("meta")
+        if not meta or not resolved_source(meta.get("source")):
+            return None
+        return MetaResult(pdf_path=path, **{k: meta[k] for k in _META_FIELDS if k in meta})
+
+    def add(self, path: str, res: Optional[MetaResult] = None, h: Optional[str] = None) -> str:
+        """
+        入库：字节已存在时只记录新文件名；res 非空时更新元数据记录。
+        返回文件哈希。
+        """
+        h = h or full_hash(path)
+        dst = self.blob_path(h)
+        if not os.path.exists(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            tmp = "%s.%d.tmp" % (dst, os.getpid())
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dst)
+        key = "blob:" + h
+        rec = dict(self.record(h) or {"meta": None, "names": [], "size": os.path.getsize(dst)})
+        name = os.path.basename(path)
+        if name not in rec["names"]:
+            rec["names"] = rec["names"] + [name]
+        if res is not None and resolved_source(res.source):
+            rec["meta"] = {k: v for k, v in asdict(res).items() if k != "pdf_path"}
+        rec["ts"] = time.time()
+        self.index.put(key, rec)
+        return h
+
+    def flush(self) -> None:
+        self.index.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def resolved_source(source: Optional[str]) -> bool:
+    """MetaResult.source 为空（只有 PDF 线索）或 "error"（无法解析 PDF）时不算解析成功。"""
+    return bool(source) and source != "error"
+
+
+def with_path(res: MetaResult, path: str) -> MetaResult:
+    return replace(res, pdf_path=path)
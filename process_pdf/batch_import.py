@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：batch_import.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/19 14:30
+'''
+"""
+批量导入整个 PDF 目录：两级流水线
+
+    PDF 路径 ──> [进程池] _extract_pdf_hints ──(有界队列)──> [线程池] 联网解析 ──(有界队列)──> MetaResult
+                                                              └─> [arXiv 批量线程] id_list 合并查询 ─┘
+
+PyMuPDF 解析是 CPU 密集型，放在进程池里；Crossref / doi.org 请求是阻塞 I/O，
+放在单独的线程组里。两级之间用有界队列连接，CPU 与网络两段同时工作而不是交替进行，
+队列满时上游自动等待，内存不会随文件数增长。结果按完成顺序流式产出。
+识别出 arXiv ID 的 PDF 不逐篇查询，而是攒够 arxiv_batch 篇（或等待 arxiv_wait 秒）后
+合并成一次 arXiv id_list 查询。
+传入 store（AttachmentStore）时先按全文件哈希去重：已入库的文件直接复用索引里的元数据，
+本次运行中内容相同的文件只解析一次，附件字节也只存一份。
+
+用法（Windows 下进程池需要放在 __main__ 保护内）：
+    from batch_import import import_pdfs
+    if __name__ == "__main__":
+        for res in import_pdfs("D:/papers", contact_email="you@example.com"):
+            print(res.pdf_path, res.title)
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from attachment_store import AttachmentStore, with_path
+from file_hash import full_hash as _full_hash
+from meta_cache import MetaCache
+from meta_resolver import get_arxiv_metadata_batch, get_doi_metadata_batch, _merge_arxiv, _normalize_doi
+from pdf_meta import (MetaResult, _extract_pdf_hints, _resolve_from_hints, _hint_cache_key, _HINT_FIELDS,
+                      _HINT_PREFIX, _result_from_meta)
+
+_DONE = object()  # 队列结束标记
+
+
+def _list_pdfs(source: Union[str, Iterable[str]]) -> List[str]:
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            found = []
+            for root, _, files in os.walk(source):
+                for name in files:
+                    if name.lower().endswith(".pdf"):
+                        found.append(os.path.join(root, name))
+            return sorted(found)
+        return [source]
+    return list(source)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """阻塞放入队列，消费端提前退出时返回 False。"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def import_pdfs(source: Union[str, Iterable[str]], contact_email: Optional[str] = None,
+                cpu_workers: Optional[int] = None, io_workers: int = 8, queue_size: int = 64,
+                hint_cache: Optional[MetaCache] = None, full_hash: bool = False,
+                arxiv_batch: int = 50, arxiv_wait: float = 1.0,
+                store: Optional[AttachmentStore] = None, use_layout_cache: bool = False,
+                **resolve_kwargs) -> Iterator[MetaResult]:
+    """
+    source: 目录（递归查找 *.pdf）或 PDF 路径列表
+    cpu_workers: 解析 PDF 的进程数，默认 CPU 核数
+    io_workers: 并发联网的线程数
+    queue_size: 每级队列 / 在途任务上限
+    hint_cache: PDF 线索缓存；命中的文件不进进程池，结束时自动 flush
+    full_hash: 线索缓存使用全文件哈希而不是首尾块指纹
+    arxiv_batch / arxiv_wait: arXiv 合并查询的批大小与最长等待时间（秒）
+    store: 附件库；给定时按内容去重并把结果写入索引，结束时自动 flush
+    use_layout_cache: 线索提取读写 PDF 旁的逐页版面缓存（paper.pdf.layout），重复导入同一批文件时不再做版面分析；
+                      会在用户的 PDF 目录里写文件，默认关闭
+    resolve_kwargs: 透传给联网解析，如 polite_delay / unresolvable / lean
+    """
+    paths = _list_pdfs(source)
+    hint_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    out_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    arxiv_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    io_left = [io_workers]
+    io_lock = threading.Lock()
+    # 附件库去重状态：path -> 哈希；哈希 -> 等待首个结果的重复文件
+    path_hash: Dict[str, str] = {}
+    inflight: Dict[str, List[str]] = {}
+    store_lock = threading.Lock()
+    errors: List[BaseException] = []
+
+    def _known(path):
+        """返回已入库的 MetaResult；本次运行已在解析的重复文件返回 False（跳过）。"""
+        try:
+            h = _full_hash(path)
+        except OSError:
+            return None, None
+        with store_lock:
+            rec = store.record(h)
+            res = store.result(path, rec) if rec else None
+            if res is not None and os.path.basename(path) not in rec.get("names", []):
+                store.add(path, None, h)  # 已入库文件的新文件名也记进索引
+            if res is None:
+                if h in inflight:
+                    inflight[h].append(path)
+                    return False, h
+                inflight[h] = []
+                path_hash[path] = h
+            return res, h
+
+    def _hint_stage():
+        todo = iter(paths)
+        pending = {}
+        with ProcessPoolExecutor(max_workers=cpu_workers) as pool:
+            exhausted = False
+            while not stop.is_set():
+                while not exhausted and len(pending) < queue_size and not stop.is_set():
+                    path = next(todo, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    key = h = None
+                    if store is not None:
+                        known, h = _known(path)
+                        if known is False:
+                            continue
+                        if known is not None:
+                            _put(hint_q, (path, known), stop)
+                            continue
+                    if hint_cache is not None:
+                        if full_hash and h:
+                            key = _HINT_PREFIX + h  # 与 _hint_cache_key 一致，免去再读一遍文件
+                        else:
+                            try:
+                                key = _hint_cache_key(path, full_hash)
+                            except OSError:
+                                key = None
+                        rec = hint_cache.get(key) if key else None
+                        if rec is not None:
+                            # 未变化的文件直接用缓存，不再打开 PDF
+                            _put(hint_q, (path, dict(rec["hints"])), stop)
+                            continue
+                    pending[pool.submit(_extract_pdf_hints, path, use_layout_cache=use_layout_cache)] = (path, key)
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    path, key = pending.pop(fut)
+                    try:
+                        hints = fut.result()
+                    except Exception:
+                        hints = None  # 损坏 / 加密的 PDF
+                    if hints is not None and key:
+                        hint_cache.put(key, {"hints": {k: hints.get(k) for k in _HINT_FIELDS},
+                                             "ts": time.time()})
+                    if not _put(hint_q, (path, hints), stop):
+                        break
+            for fut in pending:
+                fut.cancel()
+
+    def hint_stage():
+        try:
+            _hint_stage()
+        except BaseException as e:
+            # 进程池崩溃（BrokenProcessPool）、缓存写入失败等：记下错误并让整条流水线退出
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(io_workers):
+                _put(hint_q, _DONE, stop)
+
+    def io_stage():
+        while not stop.is_set():
+            try:
+                item = hint_q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            path, hints = item
+            if isinstance(hints, MetaResult):
+                res = hints  # 附件库命中
+            elif hints is None:
+                res = MetaResult(pdf_path=path, source="error", confidence=0.0)
+            elif hints.get("arxiv_id"):
+                if not _put(arxiv_q, (path, hints), stop):
+                    break
+                continue
+            else:
+                res = _resolve_one(path, hints)
+            if not _put(out_q, res, stop):
+                break
+        with io_lock:
+            io_left[0] -= 1
+            last = io_left[0] == 0
+        if last:
+            _put(arxiv_q, _DONE, stop)
+        _put(out_q, _DONE, stop)
+
+    def _resolve_one(path, hints):
+        try:
+            return _resolve_from_hints(path, hints, contact_email, **resolve_kwargs)
+        except Exception:
+            title = hints.get("title_hint") or ""
+            return MetaResult(pdf_path=path, title=title, hint_title=title, confidence=0.0)
+
+    def _enrich_batch(found):
+        # 带 DOI 的 arXiv 记录合并成 Crossref 批量查询补全期刊信息，不再逐条请求
+        unresolvable = resolve_kwargs.get("unresolvable")
+        dois = {}
+        for aid, meta in found.items():
+            d = _normalize_doi(meta.get("doi") or "")
+            if d and (unresolvable is None or d not in unresolvable):
+                dois.setdefault(d, []).append(aid)
+        if not dois:
+            return
+        for d, enriched in get_doi_metadata_batch(list(dois), contact_email).items():
+            for aid in dois.get(d, ()):
+                found[aid] = _merge_arxiv(found[aid], enriched)
+
+    def arxiv_stage():
+        finished = False
+        while not finished and not stop.is_set():
+            batch = []
+            deadline = None
+            while len(batch) < arxiv_batch and not stop.is_set():
+                timeout = 0.2 if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = arxiv_q.get(timeout=timeout)
+                except queue.Empty:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    continue
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + arxiv_wait
+            if not batch:
+                continue
+            try:
+                found = get_arxiv_metadata_batch([h["arxiv_id"] for _, h in batch], contact_email)
+            except Exception:
+                found = {}
+            try:
+                _enrich_batch(found)
+            except Exception:
+                pass  # 补全失败时保留 arXiv 记录本身
+            for path, hints in batch:
+                meta = found.get(hints["arxiv_id"])
+                if meta:
+                    res = _result_from_meta(path, meta, hints.get("title_hint") or "")
+                else:
+                    # arXiv 没查到：按普通 DOI / 标题流程再试
+                    res = _resolve_one(path, dict(hints, arxiv_id=None))
+                if not _put(out_q, res, stop):
+                    return
+        _put(out_q, _DONE, stop)
+
+    threads = [threading.Thread(target=hint_stage, name="pdf-hints", daemon=True)]
+    threads += [threading.Thread(target=io_stage, name="pdf-resolve-%d" % i, daemon=True)
+                for i in range(io_workers)]
+    threads.append(threading.Thread(target=arxiv_stage, name="pdf-arxiv", daemon=True))
+    for t in threads:
+        t.start()
+
+    remaining = io_workers + 1
+    try:
+        while remaining:
+            try:
+                res = out_q.get(timeout=0.5)
+            except queue.Empty:
+                if errors:
+                    raise errors[0]
+                if not any(t.is_alive() for t in threads):
+                    break  # 各级线程都已退出却没有送来结束标记
+                continue
+            if res is _DONE:
+                remaining -= 1
+                continue
+            if store is None:
+                yield res
+                continue
+            with store_lock:
+                h = path_hash.pop(res.pdf_path, None)
+                dups = inflight.pop(h, []) if h else []
+                if h:
+                    store.add(res.pdf_path, res, h)  # 未解析成功的结果只记文件名，下次导入重试
+                for dup in dups:
+                    store.add(dup, None, h)
+            yield res
+            for dup in dups:
+                yield with_path(res, dup)
+    finally:
+        # 调用方提前 break 时让各级线程退出
+        stop.set()
+        for t in threads:
+            t.join()
+        if hint_cache is not None:
+            hint_cache.flush()
+        if store is not None:
+            store.flush()
+
+
+if __name__ == "__main__":
+    import sys
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else "."
+    for r in import_pdfs(folder):
+        print("%.2f" % r.confidence, r.pdf_path, r.title)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：file_hash.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/19 15:20
+'''
+"""
+文件内容指纹，供各类按内容缓存的结果使用（PDF 线索、页面布局、缩略图等）。
+
+quick_fingerprint: 文件大小 + 首尾各 64 KB 的 blake2b，只读两小块，适合每次运行都要算的场合
+full_hash:         整个文件的 blake2b，用于去重等需要严格一致的场合
+"""
+import os
+import hashlib
+
+_BLOCK = 64 * 1024
+_CHUNK = 1024 * 1024
+
+
+def quick_fingerprint(path: str) -> str:
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(_BLOCK))
+        if size > 2 * _BLOCK:
+            f.seek(-_BLOCK, os.SEEK_END)
+            h.update(f.read(_BLOCK))
+        elif size > _BLOCK:
+            h.update(f.read())
+    return "q%d-%s" % (size, h.hexdigest())
+
+
+def full_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(path: str, full: bool = False) -> str:
+    return full_hash(path) if full else quick_fingerprint(path)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：id_filter.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/19 10:05
+'''
+"""
+Persistent Bloom filter of identifiers (DOIs) confirmed unresolvable.
+
+OCR 识别出来的残缺 DOI 在每次运行时都会去 doi.org / Crossref 各撞一次 404。
+把确认不存在的 DOI 记在这里，联网前先查一次即可跳过。
+
+Aging: two generations are kept. New identifiers go into the current one;
+every ``max_age / 2`` seconds the current generation becomes the previous
+one and the oldest is dropped. An identifier is therefore forgotten
+between ``max_age / 2`` and ``max_age`` after it was last added, so DOIs
+that get registered later are retried eventually.
+
+Usage:
+    from id_filter import UnresolvableFilter
+    f = UnresolvableFilter("unresolvable.bloom", capacity=200000, fp_rate=0.001)
+    if "10.1234/garbled" not in f:
+        ...  # 联网查询，确认 404 后 f.add(doi)
+    f.save()
+"""
+import os
+import math
+import time
+import struct
+import hashlib
+from typing import Optional
+
+_MAGIC = b"UBF1"
+_HEADER = struct.Struct("<4sQIdQdd")  # magic, m bits, k, fp_rate, capacity, cur_ts, prev_ts
+
+
+def _normalize(ident: str) -> str:
+    return ident.strip().lower()
+
+
+class UnresolvableFilter:
+    def __init__(self, path: Optional[str] = None, capacity: int = 100000, fp_rate: float = 0.01,
+                 max_age: float = 30 * 24 * 3600):
+        """
+        path: 持久化文件；None 表示只在内存中使用
+        capacity: 每一代预计容纳的条目数
+        fp_rate: 目标误判率（误判会让一个真实 DOI 暂时被跳过）
+        max_age: 条目最长保留时间（秒）
+        """
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be in (0, 1)")
+        self.path = path
+        self.max_age = max_age
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.m = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / capacity * math.log(2))))
+        now = time.time()
+        self._cur = bytearray((self.m + 7) // 8)
+        self._prev = bytearray((self.m + 7) // 8)
+        self._cur_ts = now
+        self._prev_ts = now
+        self._dirty = False
+        if path and os.path.exists(path):
+            self._load()
+
+    # ---------- persistence ----------
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as f:
+            data = f.read()
+        magic, m, k, fp_rate, capacity, cur_ts, prev_ts = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"not an unresolvable-id filter: {self.path}")
+        if (m, k) != (self.m, self.k):
+            # 参数变了：旧位图无法复用，重新累积
+            self._dirty = True
+            return
+        n = (m + 7) // 8
+        off = _HEADER.size
+        self._cur = bytearray(data[off:off + n])
+        self._prev = bytearray(data[off + n:off + 2 * n])
+        self._cur_ts, self._prev_ts = cur_ts, prev_ts
+
+    def save(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        tmp = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.m, self.k, self.fp_rate, self.capacity,
+                                 self._cur_ts, self._prev_ts))
+            f.write(self._cur)
+            f.write(self._prev)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    # ---------- bloom ops ----------
+
+    def _positions(self, ident: str):
+        d = hashlib.blake2b(_normalize(ident).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def _age(self) -> None:
+        now = time.time()
+        if now - self._cur_ts < self.max_age / 2:
+            return
+        if now - self._cur_ts >= self.max_age:
+            # 长时间未使用，两代都已过期
+            self._prev = bytearray(len(self._cur))
+        else:
+            self._prev = self._cur
+        self._prev_ts = self._cur_ts
+        self._cur = bytearray(len(self._prev))
+        self._cur_ts = now
+        self._dirty = True
+
+    @staticmethod
+    def _test(bits: bytearray, positions) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, ident: str) -> None:
+        self._age()
+        for p in self._positions(ident):
+            self._cur[p >> 3] |= 1 << (p & 7)
+        self._dirty = True
+
+    def __contains__(self, ident: str) -> bool:
+        if not ident:
+            return False
+        self._age()
+        pos = list(self._positions(ident))
+        return self._test(self._cur, pos) or self._test(self._prev, pos)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：layout_cache.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/20 11:15
+'''
+"""
+逐页版面缓存：每页只做一次 page.get_text("dict")，之后标题检测、正文分节等都读缓存。
+
+缓存文件放在 PDF 旁边（paper.pdf -> paper.pdf.layout），按文件内容指纹 + 页码索引，
+PDF 内容变化后旧缓存自动失效。格式（little endian）：
+
+    header : magic b"PLC1", version u16, page_count u32, fingerprint (u16 长度 + ASCII)
+    table  : page_count x (offset u64, length u32)，length 为 0 表示该页未缓存
+    pages  : span_count u32 + span_count x (line u32, size f32, x0 y0 x1 y1 f32, flags u32,
+             text_len u16, UTF-8 text)
+
+span 按阅读顺序（sort=True）保存，line 为页内行序号，用来还原行结构。
+
+用法：
+    with PageLayoutCache("paper.pdf") as lc, fitz.open("paper.pdf") as doc:
+        spans = lc.spans(doc[0])   # [(line, size, x0, y0, x1, y1, flags, text), ...]
+        text = lc.text(doc[0])     # 由缓存的 span 拼出的纯文本，可按区域裁剪
+"""
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from file_hash import quick_fingerprint
+
+_MAGIC = b"PLC1"
+_VERSION = 1
+_HEAD = struct.Struct("<4sHI")
+_SLOT = struct.Struct("<QI")
+_SPAN = struct.Struct("<IfffffIH")
+_COUNT = struct.Struct("<I")
+
+# 不带图片块（dict 默认会嵌入图片二进制）；pdf_meta / arxiv_meta 的版面分析也用同一组标志
+_SPAN_FLAGS = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+
+# span 坐标以 f32 存盘，判断是否落在裁剪区内时留一点余量
+_CLIP_TOL = 0.01
+
+Span = Tuple[int, float, float, float, float, float, int, str]
+
+
+def _layout_page(page: fitz.Page) -> List[Span]:
+    info = page.get_text("dict", flags=_SPAN_FLAGS, sort=True)
+    out: List[Span] = []
+    line_no = 0
+    for b in info.get("blocks", []):
+        if b.get("type", 0) != 0:
+            continue
+        for line in b.get("lines", []):
+            for s in line.get("spans", []):
+                txt = s.get("text") or ""
+                if not txt.strip():
+                    continue
+                x0, y0, x1, y1 = s.get("bbox", (0, 0, 0, 0))
+                out.append((line_no, float(s.get("size", 0)), x0, y0, x1, y1, int(s.get("flags", 0)), txt))
+            line_no += 1
+    return out
+
+
+def _pack_page(spans: List[Span]) -> bytes:
+    buf = bytearray(_COUNT.pack(len(spans)))
+    for line_no, size, x0, y0, x1, y1, flags, txt in spans:
+        raw = txt.encode("utf-8")[:0xFFFF]
+        buf += _SPAN.pack(line_no, size, x0, y0, x1, y1, flags, len(raw))
+        buf += raw
+    return bytes(buf)
+
+
+def _unpack_page(data: bytes) -> List[Span]:
+    (n,) = _COUNT.unpack_from(data, 0)
+    off = _COUNT.size
+    out: List[Span] = []
+    for _ in range(n):
+        line_no, size, x0, y0, x1, y1, flags, ln = _SPAN.unpack_from(data, off)
+        off += _SPAN.size
+        out.append((line_no, size, x0, y0, x1, y1, flags, data[off:off + ln].decode("utf-8", "replace")))
+        off += ln
+    return out
+
+
+class PageLayoutCache:
+    def __init__(self, pdf_path: str, cache_path: Optional[str] = None):
+        self.pdf_path = pdf_path
+        self.path = cache_path or pdf_path + ".layout"
+        self.fingerprint = quick_fingerprint(pdf_path)
+        self._pages: Dict[int, bytes] = {}
+        self._page_count = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            magic, version, count = _HEAD.unpack_from(data, 0)
+            off = _HEAD.size
+            (fp_len,) = struct.unpack_from("<H", data, off)
+            off += 2
+            fp = data[off:off + fp_len].decode("ascii")
+            off += fp_len
+        except (OSError, struct.error, UnicodeDecodeError):
+            return
+        if magic != _MAGIC or version != _VERSION or fp != self.fingerprint:
+            return  # PDF 已变化或格式不符：当作没有缓存
+        self._page_count = count
+        for pno in range(count):
+            start, length = _SLOT.unpack_from(data, off + pno * _SLOT.size)
+            if length:
+                self._pages[pno] = data[start:start + length]
+
+    def spans(self, page: fitz.Page) -> List[Span]:
+        """返回该页的 span 列表；未缓存时做一次版面分析并记入缓存。"""
+        pno = page.number
+        data = self._pages.get(pno)
+        if data is None:
+            spans = _layout_page(page)
+            self._pages[pno] = _pack_page(spans)
+            self._page_count = max(self._page_count, page.parent.page_count)
+            self._dirty = True
+            return spans
+        return _unpack_page(data)
+
+    def text(self, page: fitz.Page, clip: Optional[Tuple[float, float, float, float]] = None) -> str:
+        """
+        由缓存的 span 拼出纯文本，代替 page.get_text("text")（按行换行，空白 span 不保留）。
+        clip: (x0, y0, x1, y1)，只取整个落在该区域内的 span，同 get_text(clip=...) 只取区域内的字符
+              （跨区域边界的 span 整个舍弃，get_text 则会保留其中落在区域内的字符）
+        """
+        lines: Dict[int, List[str]] = {}
+        for line_no, _, x0, y0, x1, y1, _, txt in self.spans(page):
+            if clip is not None and not (x0 >= clip[0] - _CLIP_TOL and y0 >= clip[1] - _CLIP_TOL
+                                         and x1 <= clip[2] + _CLIP_TOL and y1 <= clip[3] + _CLIP_TOL):
+                continue
+            lines.setdefault(line_no, []).append(txt)
+        return "\n".join("".join(parts) for _, parts in sorted(lines.items()))
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        fp = self.fingerprint.encode("ascii")
+        head = _HEAD.pack(_MAGIC, _VERSION, self._page_count) + struct.pack("<H", len(fp)) + fp
+        off = len(head) + _SLOT.size * self._page_count
+        table = bytearray()
+        body = bytearray()
+        for pno in range(self._page_count):
+            data = self._pages.get(pno, b"")
+            table += _SLOT.pack(off + len(body) if data else 0, len(data))
+            body += data
+        tmp = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmp, "wb") as f:
+                f.write(head)
+                f.write(table)
+                f.write(body)
+            os.replace(tmp, self.path)
+        except OSError:
+            # 只读目录等情况：缓存只是加速手段，写不了就算了
+            return
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
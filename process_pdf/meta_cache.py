@@ -0,0 +1,491 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：meta_cache.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/19 9:12
+'''
+"""
+Immutable, memory-mapped metadata cache shared by several reader processes.
+
+File layout (little endian, version 1; sections are found via the header offsets):
+    header   : magic b"MRC1", version u16, reserved u16, count u32,
+               index_off u64, keys_off u64, recs_off u64
+    records  : 1 byte codec (0 = JSON, 1 = zlib JSON) + payload
+    keys     : concatenated UTF-8 keys
+    index    : count x (key_off u64, key_len u32, rec_off u64, rec_len u32),
+               sorted by key bytes
+
+Lookups binary-search the index directly on the mapping, so only the touched
+pages are read and every reader shares them through the OS page cache.
+
+The cache file is never modified in place. A rebuild writes a new generation
+file next to it and then atomically replaces a tiny pointer file (``path``)
+that names the current generation. Readers notice the pointer change and
+remap. The pointer indirection keeps this working on Windows, where a file
+that is still mapped by a reader cannot be replaced.
+
+Writers are serialised with a lock file (``path + ".lock"``, created with
+O_EXCL), and ``MetaCache.flush`` merges against the current generation while
+holding it, so concurrent flushes from several processes do not lose entries.
+
+Usage:
+    from meta_cache import MetaCache
+    cache = MetaCache("meta.mrc")
+    cache.put("doi:10.1038/nature14539", {"meta": {...}, "ts": time.time()})
+    cache.flush()              # 写出新一代文件并原子切换
+    cache.get("doi:10.1038/nature14539")
+"""
+import os
+import re
+import gzip
+import json
+import mmap
+import time
+import zlib
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+_MAGIC = b"MRC1"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHIQQQ")
+_ENTRY = struct.Struct("<QIQI")
+
+_CODEC_JSON = 0
+_CODEC_ZLIB = 1
+_ZLIB_MIN = 256  # 小于该长度的记录不压缩
+
+_RELOAD_CHECK = 1.0  # 秒，检查指针文件是否更新的最小间隔
+_LOCK_POLL = 0.05  # 秒，等待写锁时的轮询间隔
+_LOCK_STALE = 300.0  # 秒，锁文件超过该时间未释放视为写者已崩溃
+
+_held = threading.local()  # 本线程已持有的写锁（可重入）
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    raw = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) >= _ZLIB_MIN:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return bytes([_CODEC_ZLIB]) + packed
+    return bytes([_CODEC_JSON]) + raw
+
+
+def _decode_record(buf) -> Dict[str, Any]:
+    codec = buf[0]
+    payload = bytes(buf[1:])
+    if codec == _CODEC_ZLIB:
+        payload = zlib.decompress(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+def _read_pointer(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    if not name:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(path)), name)
+
+
+@contextmanager
+def writer_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive writer lock for the cache at ``path``, shared across processes.
+    Re-entrant within a thread; a lock file older than _LOCK_STALE seconds is
+    treated as left behind by a crashed writer and broken.
+    """
+    lock_path = os.path.abspath(path) + ".lock"
+    depth = getattr(_held, "locks", None)
+    if depth is None:
+        depth = _held.locks = {}
+    if depth.get(lock_path):
+        depth[lock_path] += 1
+        try:
+            yield
+        finally:
+            depth[lock_path] -= 1
+        return
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > _LOCK_STALE:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue  # 锁刚被释放
+            time.sleep(_LOCK_POLL)
+            continue
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        os.close(fd)
+        break
+    depth[lock_path] = 1
+    try:
+        yield
+    finally:
+        depth[lock_path] = 0
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def write_cache(path: str, entries: Iterable[Tuple[str, Dict[str, Any]]], presorted: bool = False) -> str:
+    """
+    Write ``entries`` (key, record) as a new generation and swap it in.
+    Returns the generation file path. Holds the writer lock; callers that
+    merge with the current generation should take ``writer_lock`` themselves
+    around reading it so no other writer slips in between.
+
+    presorted: entries already arrive in ascending key order without
+    duplicates; records are then streamed to disk and only the keys are
+    kept in memory. Otherwise they are collected first (later duplicates win).
+    """
+    with writer_lock(path):
+        return _write_generation(path, entries, presorted)
+
+
+def _write_generation(path: str, entries: Iterable[Tuple[str, Dict[str, Any]]], presorted: bool) -> str:
+    if not presorted:
+        collected = {}
+        for key, record in entries:
+            collected[key] = record
+        entries = sorted(collected.items())
+
+    directory = os.path.dirname(os.path.abspath(path))
+    base = os.path.basename(path)
+    gen_name = "%s.%x.%d" % (base, time.time_ns(), os.getpid())
+    gen_path = os.path.join(directory, gen_name)
+    key_blob = bytearray()
+    index = bytearray()
+    count = 0
+    last = None
+    with open(gen_path, "wb") as f:
+        # 先写占位头，记录区流式写出，最后回填真实偏移
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0, 0, 0, 0))
+        recs_off = f.tell()
+        rec_pos = 0
+        for key, record in entries:
+            k = key.encode("utf-8")
+            if last is not None and k <= last:
+                f.close()
+                os.remove(gen_path)
+                raise ValueError(f"entries not sorted at key {key!r}")
+            last = k
+            rec = _encode_record(record)
+            f.write(rec)
+            index += _ENTRY.pack(len(key_blob), len(k), rec_pos, len(rec))
+            key_blob += k
+            rec_pos += len(rec)
+            count += 1
+        keys_off = f.tell()
+        f.write(key_blob)
+        index_off = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, count, index_off, keys_off, recs_off))
+        f.flush()
+        os.fsync(f.fileno())
+
+    old = _read_pointer(path)
+    tmp = os.path.join(directory, "%s.ptr.%d" % (base, os.getpid()))
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(gen_name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    # 旧一代文件尽力删除；Windows 上仍被映射时会失败，留待下次重建清理
+    if old and old != gen_path:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    if old:
+        _cleanup_generations(directory, base, os.path.basename(old))
+    return gen_path
+
+
+def _generation_time(base: str, name: str) -> Optional[int]:
+    """Creation time (ns) encoded in a generation file name, or None for other files."""
+    m = re.fullmatch(re.escape(base) + r"\.([0-9a-f]+)\.(\d+)", name)
+    return int(m.group(1), 16) if m else None
+
+
+def _cleanup_generations(directory: str, base: str, previous: str) -> None:
+    # 只删除比上一代更早的代文件（之前删除失败遗留的），其他同名前缀的文件一律不动
+    before = _generation_time(base, previous)
+    if before is None:
+        return
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        t = _generation_time(base, name)
+        if t is None or t >= before:
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+class MetaCacheReader:
+    """Read-only view of the current generation; safe to share across processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._gen_path = None
+        self._file = None
+        self._mm = None
+        self._count = 0
+        self._index_off = self._keys_off = self._recs_off = 0
+        self._last_check = 0.0
+        self._open()
+
+    def _open(self) -> None:
+        self._last_check = time.monotonic()
+        for _ in range(3):
+            gen_path = _read_pointer(self.path)
+            if gen_path == self._gen_path:
+                return
+            self.close()
+            if not gen_path:
+                return
+            try:
+                self._map(gen_path)
+                return
+            except OSError:
+                # 读指针与打开之间写者已切换到新一代并删掉了这一代：重读指针
+                continue
+        # 多次都没打开（写者频繁切换或文件损坏）：当作空缓存，下次检查时再试
+
+    def _map(self, gen_path: str) -> None:
+        f = open(gen_path, "rb")
+        try:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                f.close()
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            f.close()
+            raise
+        magic, version, _, count, index_off, keys_off, recs_off = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            mm.close()
+            f.close()
+            raise ValueError(f"not a metadata cache file: {gen_path}")
+        self._file, self._mm, self._gen_path = f, mm, gen_path
+        self._count, self._index_off, self._keys_off, self._recs_off = count, index_off, keys_off, recs_off
+
+    def _maybe_reload(self) -> None:
+        if time.monotonic() - self._last_check >= _RELOAD_CHECK:
+            self._open()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._mm = self._file = self._gen_path = None
+        self._count = 0
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self._index_off + i * _ENTRY.size)
+
+    def _key_at(self, i: int) -> bytes:
+        key_off, key_len, _, _ = self._entry(i)
+        start = self._keys_off + key_off
+        return self._mm[start:start + key_len]
+
+    def _find(self, key: bytes) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_at(lo) == key:
+            return lo
+        return -1
+
+    def _record_at(self, i: int) -> Dict[str, Any]:
+        _, _, rec_off, rec_len = self._entry(i)
+        start = self._recs_off + rec_off
+        return _decode_record(self._mm[start:start + rec_len])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self._maybe_reload()
+        if self._mm is None:
+            return None
+        i = self._find(key.encode("utf-8"))
+        return self._record_at(i) if i >= 0 else None
+
+    def __contains__(self, key: str) -> bool:
+        self._maybe_reload()
+        return self._mm is not None and self._find(key.encode("utf-8")) >= 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """按 key 顺序流式遍历，用于重建与导出。"""
+        for i in range(self._count):
+            yield self._key_at(i).decode("utf-8"), self._record_at(i)
+
+
+class MetaCache:
+    """
+    Memory-mapped reader plus an in-process overlay of new records.
+    ``put`` only touches the overlay; ``flush`` merges it into a new
+    generation file, so other processes see the records after their
+    next reload check.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reader = MetaCacheReader(path)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()  # 后台补全线程也会 put
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            return self.reader.get(key)
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending[key] = record
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """按 key 顺序遍历文件与未写出的记录，后者优先。"""
+        with self._lock:
+            pending = sorted(self._pending.items())
+        return _merge_sorted(self.reader.items(), iter(pending), lambda old, new: new)
+
+    def flush(self) -> Optional[str]:
+        with self._lock:
+            if not self._pending:
+                return None
+            with writer_lock(self.path):
+                # 持锁后重新读指针，与其他进程刚写出的一代合并，避免互相覆盖
+                self.reader._open()
+                gen_path = write_cache(self.path, list(self.items()), presorted=True)
+            self._pending.clear()
+            self.reader._open()
+            return gen_path
+
+    def close(self) -> None:
+        self.reader.close()
+
+
+def _merge_sorted(a: Iterator[Tuple[str, Dict[str, Any]]], b: Iterator[Tuple[str, Dict[str, Any]]],
+                  choose: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+                  ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """合并两个按 key 升序的流；同 key 时由 choose(a 的记录, b 的记录) 决定保留哪条。"""
+    _end = object()
+    x = next(a, _end)
+    y = next(b, _end)
+    while x is not _end and y is not _end:
+        if x[0] < y[0]:
+            yield x
+            x = next(a, _end)
+        elif y[0] < x[0]:
+            yield y
+            y = next(b, _end)
+        else:
+            yield x[0], choose(x[1], y[1])
+            x = next(a, _end)
+            y = next(b, _end)
+    while x is not _end:
+        yield x
+        x = next(a, _end)
+    while y is not _end:
+        yield y
+        y = next(b, _end)
+
+
+# ------------------------ Warm-cache bundles ------------------------
+
+_BUNDLE_FORMAT = "meta-cache-bundle"
+_BUNDLE_VERSION = 1
+
+
+def _fresher(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """按 ts 取较新的记录；负缓存（meta 为 None）不覆盖已有的正记录。"""
+    if old.get("meta") and not new.get("meta"):
+        return old
+    if not old.get("meta") and new.get("meta"):
+        return new
+    return new if new.get("ts", 0) > old.get("ts", 0) else old
+
+
+def export_bundle(cache: MetaCache, bundle_path: str) -> int:
+    """
+    把缓存（正/负记录及其中的 etag 等校验字段）按 key 顺序写成 gzip 压缩的
+    JSON Lines 包：首行为格式头，其后每行一条 [key, record]。返回条数。
+    """
+    count = 0
+    with gzip.open(bundle_path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": _BUNDLE_FORMAT, "version": _BUNDLE_VERSION,
+                            "created": time.time()}) + "\n")
+        for key, record in cache.items():
+            f.write(json.dumps([key, record], ensure_ascii=False, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def _iter_bundle(bundle_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with gzip.open(bundle_path, "rt", encoding="utf-8") as f:
+        head = json.loads(f.readline() or "{}")
+        if head.get("format") != _BUNDLE_FORMAT:
+            raise ValueError(f"not a metadata cache bundle: {bundle_path}")
+        if head.get("version", 0) > _BUNDLE_VERSION:
+            raise ValueError(f"unsupported bundle version {head.get('version')}")
+        for line in f:
+            if line.strip():
+                key, record = json.loads(line)
+                yield key, record
+
+
+def import_bundle(cache: MetaCache, bundle_path: str) -> str:
+    """
+    流式合并一个导出包：与现有缓存做有序归并，同 key 取更新的记录，
+    结果写成新一代文件并原子切换。返回新一代文件路径。
+    """
+    cache.flush()
+    with cache._lock, writer_lock(cache.path):
+        cache.reader._open()
+        merged = _merge_sorted(cache.reader.items(), _iter_bundle(bundle_path), _fresher)
+        gen_path = write_cache(cache.path, merged, presorted=True)
+        cache.reader._open()
+    return gen_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="导出 / 导入元数据缓存包")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("cache", help="缓存指针文件，如 meta.mrc")
+    parser.add_argument("bundle", help="缓存包，如 meta-cache.jsonl.gz")
+    args = parser.parse_args()
+
+    c = MetaCache(args.cache)
+    if args.action == "export":
+        print("exported", export_bundle(c, args.bundle), "entries")
+    else:
+        import_bundle(c, args.bundle)
+        print("cache now has", len(c.reader), "entries")
@@ -20,20 +20,36 @@ Usage:
     print(get_metadata(doi="10.1038/nature14539"))
     print(get_metadata(url="https://doi.org/10.1038/nature14539"))
     print(get_metadata(url="https://arxiv.org/abs/1706.03762"))
+
+    # 多进程共享的只读缓存（见 meta_cache.py）
+    from meta_cache import MetaCache
+    cache = MetaCache("meta.mrc")
+    print(get_metadata(doi="10.1038/nature14539", cache=cache))
+    cache.flush()
 """
 
 import re
 import json
 import html
+import time
+import threading
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple, Union
 import xml.etree.ElementTree as ET
 
+from meta_cache import MetaCache, MetaCacheReader
+from id_filter import UnresolvableFilter
+
 _CROSSREF_API = "https://api.crossref.org/works"
 _DOI_BASE = "https://doi.org/"
 _ARXIV_API = "http://export.arxiv.org/api/query"  # Atom
+_NEGATIVE_TTL = 7 * 24 * 3600  # 未解析结果的缓存有效期（秒）
+# search / filter 端点的 select= 字段投影：只取用得到的字段（不含 reference/license/funder/link/abstract）
+_CROSSREF_SELECT = "DOI,title,author,issued,published-print,published-online,container-title,URL"
+_CROSSREF_BATCH = 50  # 每次 filter=doi:... 查询的最大 DOI 数
 
 
 # ------------------------ Utilities ------------------------
@@ -94,6 +110,12 @@ def _format_authors_cr(auth: Any) -> List[str]:
 # ------------------------ DOI path ------------------------
 
 def _get_metadata_from_doi(doi: str, contact_email: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return _lookup_doi(doi, contact_email)[0]
+
+
+def _lookup_doi(doi: str, contact_email: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """返回 (元数据, 是否确认不存在)。只有 doi.org 与 Crossref 都回 404 才算确认不存在。"""
+    not_found = 0
     doi = doi.strip().replace(" ", "")
     if doi.lower().startswith("https://doi.org/") or doi.lower().startswith("http://doi.org/"):
         doi = re.sub(r"^https?://doi\.org/", "", doi, flags=re.I)
@@ -107,6 +129,8 @@ def _get_metadata_from_doi(doi: str, contact_email: Optional[str] = None) -> Opt
             timeout=(8, 15),
             allow_redirects=True,
         )
+        if r.status_code == 404:
+            not_found += 1
         if r.status_code == 200 and r.headers.get("Content-Type", "").startswith(
                 ("application/vnd.citationstyles", "application/json")):
             d = r.json()
@@ -137,7 +161,7 @@ def _get_metadata_from_doi(doi: str, contact_email: Optional[str] = None) -> Opt
                 "doi": doi,
                 "url": url,
                 "source": "doi.org"
-            }
+            }, False
     except Exception:
         pass
 
@@ -146,6 +170,8 @@ def _get_metadata_from_doi(doi: str, contact_email: Optional[str] = None) -> Opt
         r = requests.get(f"{_CROSSREF_API}/{requests.utils.quote(doi)}",
                          headers=_headers(contact_email),
                          timeout=(8, 15))
+        if r.status_code == 404:
+            not_found += 1
         if r.status_code == 200:
             m = r.json().get("message", {})
             title = (m.get("title") or [""])[0]
@@ -170,11 +196,65 @@ def _get_metadata_from_doi(doi: str, contact_email: Optional[str] = None) -> Opt
                 "doi": doi,
                 "url": url,
                 "source": "crossref"
-            }
+            }, False
     except Exception:
         pass
 
-    return None
+    return None, not_found == 2
+
+
+def _meta_from_crossref_item(m: Dict[str, Any], source: str = "crossref") -> Dict[str, Any]:
+    doi = m.get("DOI") or ""
+    year = None
+    for key in ("issued", "published-print", "published-online"):
+        dp = (m.get(key) or {}).get("date-parts") or []
+        if dp and dp[0]:
+            year = _norm_year(dp[0][0])
+            if year:
+                break
+    container = (m.get("container-title") or [""])
+    container = container[0] if container else ""
+    return {
+        "title": _clean_text((m.get("title") or [""])[0]),
+        "authors": _format_authors_cr(m.get("author")),
+        "year": year,
+        "container": _clean_text(container),
+        "abstract": _clean_abstract(m.get("abstract")),
+        "doi": doi,
+        "url": m.get("URL") or f"{_DOI_BASE}{doi}",
+        "source": source
+    }
+
+
+def get_doi_metadata_batch(dois: List[str], contact_email: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    用 Crossref filter=doi:A,doi:B,... 一次查询多个 DOI（每批最多 _CROSSREF_BATCH 个，
+    select= 字段投影，不含摘要）。返回 {小写 DOI: metadata}；查不到的 DOI 不出现在结果中。
+    """
+    wanted = []
+    for d in dois:
+        d = _normalize_doi(d)
+        # filter 语法以逗号分隔，含逗号的 DOI 无法放进批量查询
+        if d and "," not in d and d not in wanted:
+            wanted.append(d)
+    out: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(wanted), _CROSSREF_BATCH):
+        chunk = wanted[i:i + _CROSSREF_BATCH]
+        params = {"filter": ",".join("doi:" + d for d in chunk), "rows": len(chunk),
+                  "select": _CROSSREF_SELECT}
+        try:
+            r = requests.get(_CROSSREF_API, params=params, timeout=(8, 30),
+                             headers={**_headers(contact_email), "Accept-Encoding": "gzip, deflate"})
+            if r.status_code != 200:
+                continue
+            items = r.json().get("message", {}).get("items", []) or []
+        except Exception:
+            continue
+        for it in items:
+            d = (it.get("DOI") or "").lower()
+            if d in chunk:
+                out[d] = _meta_from_crossref_item(it, source="crossref-batch")
+    return out
 
 
 # ------------------------ arXiv path ------------------------
@@ -205,52 +285,108 @@ def _extract_arxiv_id(s: str) -> Optional[str]:
     return None
 
 
+_ARXIV_NS = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+_ARXIV_BATCH = 50  # 每次 id_list 查询的最大 ID 数
+
+
+def _parse_arxiv_entry(entry: ET.Element, aid: str) -> Dict[str, Any]:
+    ns = _ARXIV_NS
+    title = entry.findtext("atom:title", default="", namespaces=ns)
+    summary = entry.findtext("atom:summary", default="", namespaces=ns)
+    published = entry.findtext("atom:published", default="", namespaces=ns)
+    link_id = entry.findtext("atom:id", default="", namespaces=ns)
+
+    authors = []
+    for a in entry.findall("atom:author", ns):
+        nm = a.findtext("atom:name", default="", namespaces=ns)
+        if nm:
+            authors.append(_clean_text(nm))
+
+    doi = entry.findtext("arxiv:doi", default="", namespaces=ns) or ""
+    journal_ref = entry.findtext("arxiv:journal_ref", default="", namespaces=ns) or ""
+    year = _norm_year(published)
+
+    # 优先使用 journal_ref 作为 container，否则标记为 arXiv
+    container = journal_ref if journal_ref else "arXiv"
+
+    return {
+        "title": _clean_text(title),
+        "authors": authors,
+        "year": year,
+        "container": _clean_text(container),
+        "abstract": _clean_text(summary),
+        "doi": doi,
+        "url": link_id or f"https://arxiv.org/abs/{aid}",
+        "source": "arxiv"
+    }
+
+
 def _get_metadata_from_arxiv(url_or_id: str) -> Optional[Dict[str, Any]]:
+    return _lookup_arxiv(url_or_id)[0]
+
+
+def _lookup_arxiv(url_or_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """返回 (元数据, 是否确认不存在)。只有 arXiv 正常应答且没有该条目才算确认不存在。"""
     aid = _extract_arxiv_id(url_or_id)
     if not aid:
-        return None
+        return None, False
     params = {"id_list": aid}
     try:
         r = requests.get(_ARXIV_API, params=params, timeout=(8, 15),
                     headers=_headers(accept_json=False))
         if r.status_code != 200:
-            return None
+            return None, False
         root = ET.fromstring(r.text)
-        ns = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
-        entry = root.find("atom:entry", ns)
-        if entry is None:
-            return None
-
-        title = entry.findtext("atom:title", default="", namespaces=ns)
-        summary = entry.findtext("atom:summary", default="", namespaces=ns)
-        published = entry.findtext("atom:published", default="", namespaces=ns)
-        link_id = entry.findtext("atom:id", default="", namespaces=ns)
-
-        authors = []
-        for a in entry.findall("atom:author", ns):
-            nm = a.findtext("atom:name", default="", namespaces=ns)
-            if nm:
-                authors.append(_clean_text(nm))
-
-        doi = entry.findtext("arxiv:doi", default="", namespaces=ns) or ""
-        journal_ref = entry.findtext("arxiv:journal_ref", default="", namespaces=ns) or ""
-        year = _norm_year(published)
-
-        # 优先使用 journal_ref 作为 container，否则标记为 arXiv
-        container = journal_ref if journal_ref else "arXiv"
-
-        return {
-            "title": _clean_text(title),
-            "authors": authors,
-            "year": year,
-            "container": _clean_text(container),
-            "abstract": _clean_text(summary),
-            "doi": doi,
-            "url": link_id or f"https://arxiv.org/abs/{aid}",
-            "source": "arxiv"
-        }
+        entry = root.find("atom:entry", _ARXIV_NS)
+        # 不存在的 ID 返回空结果，或一条 atom:id 指向 api/errors 的错误条目
+        if entry is None or _extract_arxiv_id(entry.findtext("atom:id", default="", namespaces=_ARXIV_NS)) != aid:
+            return None, True
+        return _parse_arxiv_entry(entry, aid), False
     except Exception:
-        return None
+        return None, False
+
+
+def get_arxiv_metadata_batch(ids: List[str], contact_email: Optional[str] = None,
+                             enrich: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    一次 id_list 查询取回多篇 arXiv 元数据（每批最多 _ARXIV_BATCH 个）。
+    返回 {arXiv ID（不含版本号）: metadata}；查不到的 ID 不出现在结果中。
+    enrich: 对带 DOI 的记录再用 DOI 补全期刊信息（逐条请求）。
+    """
+    return _arxiv_batch_checked(ids, contact_email, enrich)[0]
+
+
+def _arxiv_batch_checked(ids: List[str], contact_email: Optional[str] = None, enrich: bool = False
+                         ) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """同 get_arxiv_metadata_batch，另返回确认不存在的 ID：所在批次正常应答且结果里没有该条目。"""
+    wanted = []
+    for x in ids:
+        aid = _extract_arxiv_id(x)
+        if aid and aid not in wanted:
+            wanted.append(aid)
+    out: Dict[str, Dict[str, Any]] = {}
+    absent: Set[str] = set()
+    for i in range(0, len(wanted), _ARXIV_BATCH):
+        chunk = wanted[i:i + _ARXIV_BATCH]
+        try:
+            r = requests.get(_ARXIV_API, params={"id_list": ",".join(chunk), "max_results": len(chunk)},
+                             timeout=(8, 30), headers=_headers(contact_email, accept_json=False))
+            if r.status_code != 200:
+                continue
+            root = ET.fromstring(r.text)
+        except Exception:
+            continue
+        for entry in root.findall("atom:entry", _ARXIV_NS):
+            # atom:id 形如 http://arxiv.org/abs/2506.21611v2；错误条目指向 api/errors
+            aid = _extract_arxiv_id(entry.findtext("atom:id", default="", namespaces=_ARXIV_NS))
+            if aid in chunk:
+                out[aid] = _parse_arxiv_entry(entry, aid)
+        absent.update(a for a in chunk if a not in out)
+    if enrich:
+        for aid, meta in out.items():
+            if meta.get("doi"):
+                out[aid] = _enrich_arxiv(meta, contact_email) or meta
+    return out, absent
 
 
 # ------------------------ Generic URL path ------------------------
@@ -281,13 +417,23 @@ def _find_doi_in_html(soup: BeautifulSoup) -> Optional[str]:
 
 
 def _get_metadata_from_generic_url(url: str, contact_email: Optional[str]) -> Optional[Dict[str, Any]]:
+    return _lookup_generic_url(url, contact_email)[0]
+
+
+def _lookup_generic_url(url: str, contact_email: Optional[str]) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """返回 (元数据, 是否确认不存在)；页面 404 / 410 才算确认不存在。"""
     try:
         r = requests.get(url, headers=_headers(contact_email, accept_json=False), timeout=(8, 20))
+        if r.status_code in (404, 410):
+            return None, True
         r.raise_for_status()
     except Exception:
-        return None
+        return None, False
+    return _meta_from_html(url, r.text, contact_email), False
+
 
-    soup = BeautifulSoup(r.text, "html.parser")
+def _meta_from_html(url: str, text: str, contact_email: Optional[str]) -> Dict[str, Any]:
+    soup = BeautifulSoup(text, "html.parser")
 
     # 先尝试在 HTML 里找 DOI，再走 DOI 流程
     doi = _extract_doi_from_url(url) or _find_doi_in_html(soup)
@@ -337,56 +483,278 @@ def _get_metadata_from_generic_url(url: str, contact_email: Optional[str]) -> Op
     }
 
 
+# ------------------------ Cache ------------------------
+
+def _normalize_doi(doi: str) -> str:
+    doi = doi.strip().replace(" ", "")
+    return re.sub(r"^https?://(?:dx\.)?doi\.org/", "", doi, flags=re.I).lower()
+
+
+def _cache_key(doi: Optional[str] = None, url: Optional[str] = None) -> Optional[str]:
+    if doi:
+        return "doi:" + _normalize_doi(doi)
+    if url:
+        aid = _extract_arxiv_id(url)
+        if aid:
+            return "arxiv:" + aid
+        doi2 = _extract_doi_from_url(url)
+        if doi2:
+            return "doi:" + _normalize_doi(doi2)
+        return "url:" + url.strip()
+    return None
+
+
+_READERS: Dict[str, MetaCacheReader] = {}  # 每个进程按路径复用同一映射
+
+
+def _open_cache(cache: Union[str, MetaCache, MetaCacheReader, None]):
+    if isinstance(cache, str):
+        if cache not in _READERS:
+            _READERS[cache] = MetaCacheReader(cache)
+        return _READERS[cache]
+    return cache
+
+
+def _empty_result(doi: Optional[str], url: Optional[str]) -> Dict[str, Any]:
+    return {
+        "title": "",
+        "authors": [],
+        "year": None,
+        "container": "",
+        "abstract": "",
+        "doi": doi or "",
+        "url": url or (f"{_DOI_BASE}{doi}" if doi else ""),
+        "source": "none"
+    }
+
+
 # ------------------------ Public entry ------------------------
 
-def get_metadata(doi: Optional[str] = None, url: Optional[str] = None, contact_email: Optional[str] = None) -> Dict[
-    str, Any]:
+def get_metadata(doi: Optional[str] = None, url: Optional[str] = None, contact_email: Optional[str] = None,
+                 cache: Union[str, MetaCache, MetaCacheReader, None] = None,
+                 unresolvable: Optional[UnresolvableFilter] = None,
+                 defer_enrich: bool = False,
+                 on_enriched: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
     """
     Return a normalized metadata dict:
         {title, authors, year, container, abstract, doi, url, source}
+
+    cache: a ``MetaCache`` / ``MetaCacheReader`` or the path of a cache file.
+    Hits are served by binary search on the memory-mapped file; with a
+    ``MetaCache`` fresh results (including misses) are added to its overlay
+    and become visible to other processes after ``cache.flush()``. Misses
+    are cached only when every registry tried confirmed the identifier does
+    not exist; timeouts and server errors leave the key uncached.
+    unresolvable: Bloom filter of DOIs known not to exist; checked before
+    any network request and extended when both registries answer 404.
+    defer_enrich: for arXiv records that carry a DOI, return the arXiv
+    metadata right away and run the DOI enrichment on a background thread.
+    The enriched dict is written back to ``cache`` and passed to
+    ``on_enriched``; call ``wait_enrichments()`` before ``cache.flush()``
+    in scripts that exit right after importing.
+    """
+    cache = _open_cache(cache)
+    key = _cache_key(doi, url)
+    if cache is not None and key:
+        rec = cache.get(key)
+        if rec is not None:
+            if rec.get("meta"):
+                return dict(rec["meta"])
+            if time.time() - rec.get("ts", 0) < _NEGATIVE_TTL:
+                return _empty_result(doi, url)
+
+    meta, missing = _resolve_checked(doi, url, contact_email, unresolvable, enrich=not defer_enrich)
+    if isinstance(cache, MetaCache) and key:
+        if meta["source"] != "none":
+            cache.put(key, {"meta": meta, "ts": time.time()})
+        elif missing:
+            cache.put(key, {"meta": None, "ts": time.time()})
+
+    if defer_enrich and meta["source"] == "arxiv" and meta.get("doi"):
+        def _run():
+            # 写缓存和回调都在任务内完成：wait_enrichments 返回时它们一定已经执行过
+            enriched = _enrich_arxiv(dict(meta), contact_email, unresolvable)
+            if not enriched:
+                return
+            if isinstance(cache, MetaCache) and key:
+                cache.put(key, {"meta": enriched, "ts": time.time()})
+            if on_enriched is not None:
+                on_enriched(enriched)
+
+        fut = _enrich_executor().submit(_run)
+        with _ENRICH_LOCK:
+            _ENRICH_PENDING.add(fut)
+
+        def _done(f: Future):
+            with _ENRICH_LOCK:
+                _ENRICH_PENDING.discard(f)
+
+        fut.add_done_callback(_done)
+    return meta
+
+
+def get_metadata_batch(dois: List[str] = (), arxiv_ids: List[str] = (), contact_email: Optional[str] = None,
+                       cache: Union[str, MetaCache, MetaCacheReader, None] = None,
+                       unresolvable: Optional[UnresolvableFilter] = None,
+                       single_fallback: bool = False) -> Dict[str, Dict[str, Any]]:
     """
+    批量版 get_metadata：先查缓存，未命中的 DOI / arXiv ID 各自合并成少量批量请求。
+    single_fallback: 批量查询里没有的 DOI 再逐个经 doi.org / Crossref 查询（每个 DOI 一次请求，默认关闭）
+    返回 {缓存 key（"doi:..." / "arxiv:..."）: metadata}，解析不到的 key 不出现在结果中。
+    与 get_metadata 一样，MetaCache 会记下新结果；未命中只在确认不存在时记下：
+    arXiv 批量查询正常应答却没有该条目，或 DOI 经 single_fallback 在 doi.org / Crossref 都回 404。
+    Crossref 批量查询没有的 DOI 可能是 DataCite 等注册的，不算确认不存在。
+    """
+    cache = _open_cache(cache)
+    out: Dict[str, Dict[str, Any]] = {}
+    miss_doi, miss_arxiv = [], []
+    now = time.time()
+    keys = [("doi:" + _normalize_doi(d), d) for d in dois] + \
+           [("arxiv:" + a, a) for a in filter(None, (_extract_arxiv_id(x) for x in arxiv_ids))]
+    for key, ident in keys:
+        if key in out:
+            continue
+        rec = cache.get(key) if cache is not None else None
+        if rec is not None:
+            if rec.get("meta"):
+                out[key] = dict(rec["meta"])
+                continue
+            if now - rec.get("ts", 0) < _NEGATIVE_TTL:
+                continue
+        if key.startswith("doi:"):
+            if unresolvable is not None and key[4:] in unresolvable:
+                continue
+            miss_doi.append(key[4:])
+        else:
+            miss_arxiv.append(ident)
+
+    found = {"doi:" + d: m for d, m in get_doi_metadata_batch(miss_doi, contact_email).items()}
+    arxiv_found, arxiv_absent = _arxiv_batch_checked(miss_arxiv, contact_email)
+    found.update({"arxiv:" + a: m for a, m in arxiv_found.items()})
+    absent = {"arxiv:" + a for a in arxiv_absent}
+    if single_fallback:
+        # 不在 Crossref 的 DOI（如 DataCite 注册的）再逐个走 doi.org
+        for d in miss_doi:
+            if "doi:" + d not in found:
+                m, missing = _doi_checked(d, contact_email, unresolvable)
+                if m:
+                    found["doi:" + d] = m
+                elif missing:
+                    absent.add("doi:" + d)
+    out.update(found)
+    if isinstance(cache, MetaCache):
+        for key, m in found.items():
+            cache.put(key, {"meta": m, "ts": now})
+        for key in absent:
+            cache.put(key, {"meta": None, "ts": now})
+    return out
+
+
+# ------------------------ Background enrichment ------------------------
+
+_ENRICH_WORKERS = 2
+_ENRICH_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_ENRICH_PENDING = set()
+_ENRICH_LOCK = threading.Lock()
+
+
+def _enrich_executor() -> ThreadPoolExecutor:
+    global _ENRICH_EXECUTOR
+    with _ENRICH_LOCK:
+        if _ENRICH_EXECUTOR is None:
+            _ENRICH_EXECUTOR = ThreadPoolExecutor(max_workers=_ENRICH_WORKERS,
+                                                  thread_name_prefix="meta-enrich")
+        return _ENRICH_EXECUTOR
+
+
+def wait_enrichments(timeout: Optional[float] = None) -> bool:
+    """等待所有后台补全完成；超时返回 False。"""
+    with _ENRICH_LOCK:
+        pending = list(_ENRICH_PENDING)
+    _, not_done = wait(pending, timeout=timeout)
+    return not not_done
+
+
+def _enrich_arxiv(meta: Dict[str, Any], contact_email: Optional[str],
+                  unresolvable: Optional[UnresolvableFilter] = None) -> Optional[Dict[str, Any]]:
+    """用 arXiv 记录里的 DOI 补全期刊信息；失败返回 None。"""
+    enriched = _doi_with_filter(meta["doi"], contact_email, unresolvable)
+    if not enriched:
+        return None
+    return _merge_arxiv(meta, enriched)
+
+
+def _merge_arxiv(meta: Dict[str, Any], enriched: Dict[str, Any]) -> Dict[str, Any]:
+    """用 DOI 查到的期刊等信息补全 arXiv 记录，但保留 arXiv 摘要与链接作为优先。"""
+    enriched = dict(enriched)
+    enriched["abstract"] = meta["abstract"] or enriched.get("abstract", "")
+    enriched["url"] = meta["url"] or enriched.get("url", "")
+    return enriched
+
+
+def _doi_with_filter(doi: str, contact_email: Optional[str],
+                     unresolvable: Optional[UnresolvableFilter] = None) -> Optional[Dict[str, Any]]:
+    return _doi_checked(doi, contact_email, unresolvable)[0]
+
+
+def _doi_checked(doi: str, contact_email: Optional[str],
+                 unresolvable: Optional[UnresolvableFilter] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """同 _doi_with_filter，另返回是否确认不存在（在过滤器中，或两处都回 404）。"""
+    if unresolvable is not None and _normalize_doi(doi) in unresolvable:
+        return None, True
+    found, missing = _lookup_doi(doi, contact_email=contact_email)
+    if missing and unresolvable is not None:
+        unresolvable.add(_normalize_doi(doi))
+    return found, missing
+
+
+def _resolve_metadata(doi: Optional[str], url: Optional[str], contact_email: Optional[str],
+                      unresolvable: Optional[UnresolvableFilter] = None, enrich: bool = True) -> Dict[str, Any]:
+    return _resolve_checked(doi, url, contact_email, unresolvable, enrich)[0]
+
+
+def _resolve_checked(doi: Optional[str], url: Optional[str], contact_email: Optional[str],
+                     unresolvable: Optional[UnresolvableFilter] = None, enrich: bool = True
+                     ) -> Tuple[Dict[str, Any], bool]:
+    """
+    返回 (元数据, 是否确认不存在)。只有尝试过的每条途径都明确答复“没有”才算确认不存在；
+    超时、5xx、解析异常等都不算，调用方不应为此写负缓存。
+    """
+    confirmed = True
     # 1) explicit DOI
     if doi:
-        meta = _get_metadata_from_doi(doi, contact_email=contact_email)
+        meta, missing = _doi_checked(doi, contact_email, unresolvable)
         if meta:
-            return meta
+            return meta, False
+        confirmed = confirmed and missing
 
     # 2) URL path
     if url:
         # arXiv?
         if _extract_arxiv_id(url):
-            meta = _get_metadata_from_arxiv(url)
+            meta, missing = _lookup_arxiv(url)
             if meta:
                 # 如果 arXiv 给出了 DOI，可进一步用 DOI 补全期刊信息（可选）
-                if meta.get("doi"):
-                    enriched = _get_metadata_from_doi(meta["doi"], contact_email=contact_email)
+                if enrich and meta.get("doi"):
+                    enriched = _enrich_arxiv(meta, contact_email, unresolvable)
                     if enriched:
-                        # 用期刊等补全，但保留 arXiv 摘要作为优先
-                        enriched["abstract"] = meta["abstract"] or enriched.get("abstract", "")
-                        enriched["url"] = meta["url"] or enriched.get("url", "")
-                        return enriched
-                return meta
+                        return enriched, False
+                return meta, False
+            confirmed = confirmed and missing
         # DOI URL?
         doi2 = _extract_doi_from_url(url)
         if doi2:
-            meta = _get_metadata_from_doi(doi2, contact_email=contact_email)
+            meta, missing = _doi_checked(doi2, contact_email, unresolvable)
             if meta:
-                return meta
+                return meta, False
+            confirmed = confirmed and missing
         # generic HTML
-        meta = _get_metadata_from_generic_url(url, contact_email=contact_email)
+        meta, missing = _lookup_generic_url(url, contact_email)
         if meta:
-            return meta
+            return meta, False
+        confirmed = confirmed and missing
 
-    return {
-        "title": "",
-        "authors": [],
-        "year": None,
-        "container": "",
-        "abstract": "",
-        "doi": doi or "",
-        "url": url or (f"{_DOI_BASE}{doi}" if doi else ""),
-        "source": "none"
-    }
+    return _empty_result(doi, url), confirmed and bool(doi or url)
 
 
 # ------------------------ CLI test ------------------------
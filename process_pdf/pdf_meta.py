@@ -19,28 +19,41 @@
     meta = extract_and_fetch("paper.pdf", contact_email="you@example.com")
 """
 # from __future__ import annotations
+import os
 import re
 import html
 import time
 import json
+from array import array
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 
 import requests
 import fitz  # PyMuPDF
 
+from id_filter import UnresolvableFilter
+from meta_cache import MetaCache
+from file_hash import fingerprint
+from layout_cache import PageLayoutCache, _SPAN_FLAGS
+from meta_resolver import get_metadata, _CROSSREF_SELECT
+from pdf_text import iter_pages_parallel, page_text
+
 _CROSSREF_API = "https://api.crossref.org/works"
 _DOI_BASE = "https://doi.org/"
 
-def _headers(contact_email: Optional[str] = None) -> Dict[str, str]:
+def _headers(contact_email: Optional[str] = None, lean: bool = False) -> Dict[str, str]:
     ua = "PaperMetaBot/1.0 (+https://example.org)"
     if contact_email:
         ua += f" mailto:{contact_email}"
-    return {
+    headers = {
         "User-Agent": ua,
         "Accept": "application/json",
     }
+    if lean:
+        headers["Accept-Encoding"] = "gzip, deflate"
+    return headers
 
 # ------------------ PDF 解析：DOI / 标题线索 ------------------
 
@@ -55,6 +68,20 @@ def _detect_doi_in_text(text: str) -> Optional[str]:
     doi = doi.rstrip(").,;")
     return doi
 
+# arXiv 左侧页边水印，如 "arXiv:2506.21611v2  [cs.CL]  27 Jun 2025"
+_ARXIV_STAMP_RE = re.compile(r"arXiv:\s*(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?", re.I)
+_ARXIV_LINK_RE = re.compile(r"arxiv\.org/(?:abs|pdf)/(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})", re.I)
+# arXiv 下载的默认文件名，如 2506.21611v2.pdf
+_ARXIV_FILE_RE = re.compile(r"^(\d{2}(?:0[1-9]|1[0-2])\.\d{4,5})(?:v\d+)?(?:\.pdf)?$", re.I)
+
+def _detect_arxiv_id(text: str) -> Optional[str]:
+    m = _ARXIV_STAMP_RE.search(text or "") or _ARXIV_LINK_RE.search(text or "")
+    return m.group(1) if m else None
+
+def _arxiv_id_from_filename(pdf_path: str) -> Optional[str]:
+    m = _ARXIV_FILE_RE.match(os.path.basename(pdf_path))
+    return m.group(1) if m else None
+
 def _tokenize(s: str) -> List[str]:
     return re.findall(r"[A-Za-z0-9]+", (s or "").lower())
 
@@ -64,51 +91,50 @@ def _token_jaccard(a: str, b: str) -> float:
         return 0.0
     return len(ta & tb) / len(ta | tb)
 
-def _extract_title_from_page(page: fitz.Page) -> Optional[str]:
+_TOP_BAND = 0.3  # 页面顶部该比例视为标题 / 页眉区
+
+def _top_band_spans(page: fitz.Page, band: float = 0.3) -> Tuple[array, array, List[str]]:
     """
-    版心顶部区域，取最大字号连行作为标题（避开 Abstract/Keywords/DOI 等噪声）。
+    只对页面顶部 band 比例的区域做版面分析，返回紧凑的平行数组 (字号, y0, 文本)。
     """
-    try:
-        info = page.get_text("dict")
-    except Exception:
-        return None
-
-    h = float(page.rect.height)
-    spans = []
+    r = page.rect
+    clip = fitz.Rect(r.x0, r.y0, r.x1, r.y0 + band * r.height)
+    info = page.get_text("dict", clip=clip, flags=_SPAN_FLAGS)
+    sizes, ys, texts = array("f"), array("f"), []
     for b in info.get("blocks", []):
         if b.get("type", 0) != 0:
             continue
         for line in b.get("lines", []):
             for s in line.get("spans", []):
                 txt = (s.get("text") or "").strip()
-                if not txt:
+                if len(txt) <= 3:
                     continue
-                y0 = float(s.get("bbox", [0, 0, 0, 0])[1])
-                spans.append(
-                    dict(text=txt, size=float(s.get("size", 0)), y0=y0)
-                )
-
-    # 顶部 30% 视为标题候选区
-    top_spans = [s for s in spans if s["y0"] < 0.3 * h and len(s["text"]) > 3]
-    if not top_spans:
+                sizes.append(s.get("size", 0))
+                ys.append(s.get("bbox", (0, 0, 0, 0))[1])
+                texts.append(txt)
+    return sizes, ys, texts
+
+def _title_from_spans(sizes, ys, texts: List[str]) -> Optional[str]:
+    """在顶部区域的 span 中取最大字号连行作为标题（避开 Abstract/Keywords/DOI 等噪声）。"""
+    if not texts:
         return None
 
-    max_size = max(s["size"] for s in top_spans)
-    cand = [s for s in top_spans if s["size"] >= 0.9 * max_size]
-    cand.sort(key=lambda s: (s["y0"], -s["size"]))
+    max_size = max(sizes)
+    cand = [i for i in range(len(texts)) if sizes[i] >= 0.9 * max_size]
+    cand.sort(key=lambda i: (ys[i], -sizes[i]))
 
     # 合并相近行
     lines: List[str] = []
     buf: List[str] = []
     last_y = None
-    for s in cand:
-        if last_y is None or abs(s["y0"] - last_y) <= (1.6 * s["size"]):
-            buf.append(s["text"])
+    for i in cand:
+        if last_y is None or abs(ys[i] - last_y) <= (1.6 * sizes[i]):
+            buf.append(texts[i])
         else:
             if buf:
                 lines.append(" ".join(buf))
-                buf = [s["text"]]
-        last_y = s["y0"]
+                buf = [texts[i]]
+        last_y = ys[i]
     if buf:
         lines.append(" ".join(buf))
 
@@ -127,42 +153,200 @@ def _extract_title_from_page(page: fitz.Page) -> Optional[str]:
         return " ".join(cleaned[:2])
     return None
 
-def _extract_pdf_hints(pdf_path: str, max_pages: int = 2) -> Dict[str, Any]:
-    doc = fitz.open(pdf_path)
-    text_all = []
-    doi = None
-    for i in range(min(max_pages, len(doc))):
-        t = doc[i].get_text("text") or ""
-        text_all.append(t)
-        if doi is None:
-            doi = _detect_doi_in_text(t)
-
-    title = _extract_title_from_page(doc[0]) if len(doc) > 0 else None
-
-    # 兜底：文本层前若干行择一
-    if not title and text_all:
-        lines = [x.strip() for x in text_all[0].splitlines() if x.strip()]
-        for l in lines[:15]:
-            if re.search(r"\b(abstract|introduction|keywords|doi)\b", l, re.I):
-                break
-            if re.search(r"(arxiv|issn|www|http)", l, re.I):
-                continue
-            letters = sum(ch.isalpha() for ch in l)
-            digits = sum(ch.isdigit() for ch in l)
-            if letters > 2 * digits and len(l) > 5:
-                title = l
-                break
-
-    # 粗略年份候选
-    year = None
-    yr_cands = re.findall(r"\b(19|20)\d{2}\b", "\n".join(text_all))
-    if yr_cands:
-        years = [int(x[0] + x[1:]) if isinstance(x, tuple) else int(x) for x in yr_cands]  # 防小瑕疵
-        years = [y for y in years if 1900 <= y <= (datetime.now().year + 1)]
-        if years:
-            year = min(years)
-
-    return {"doi": doi, "title_hint": title, "year_hint": year, "text_sample": "\n".join(text_all[:2])}
+def _top_band_from_layout(page: fitz.Page, layout: PageLayoutCache, band: float = 0.3
+                          ) -> Tuple[array, array, List[str]]:
+    """同 _top_band_spans，但从逐页版面缓存中筛选顶部区域的 span。"""
+    limit = page.rect.y0 + band * page.rect.height
+    sizes, ys, texts = array("f"), array("f"), []
+    for _, size, _, y0, _, _, _, txt in layout.spans(page):
+        txt = txt.strip()
+        if y0 < limit and len(txt) > 3:
+            sizes.append(size)
+            ys.append(y0)
+            texts.append(txt)
+    return sizes, ys, texts
+
+def _extract_title_from_page(page: fitz.Page, layout: Optional[PageLayoutCache] = None) -> Optional[str]:
+    """
+    版心顶部区域（裁剪到顶部 30%），取最大字号连行作为标题。
+    layout: 逐页版面缓存；给定时从缓存取 span，不再对页面做版面分析
+    """
+    try:
+        if layout is not None:
+            sizes, ys, texts = _top_band_from_layout(page, layout, _TOP_BAND)
+        else:
+            sizes, ys, texts = _top_band_spans(page, _TOP_BAND)
+    except Exception:
+        return None
+    return _title_from_spans(sizes, ys, texts)
+
+def _page_text(page: fitz.Page, layout: Optional[PageLayoutCache] = None, clip: Optional[fitz.Rect] = None) -> str:
+    """page.get_text("text", clip=clip)；给定逐页版面缓存时由缓存的 span 拼出，不再分析页面。"""
+    if layout is not None:
+        return layout.text(page, None if clip is None else tuple(clip))
+    return page.get_text("text", clip=clip) or ""
+
+def _title_from_lines(text: str) -> Optional[str]:
+    """兜底：文本层前若干行择一作为标题。"""
+    lines = [x.strip() for x in (text or "").splitlines() if x.strip()]
+    for l in lines[:15]:
+        if re.search(r"\b(abstract|introduction|keywords|doi)\b", l, re.I):
+            break
+        if re.search(r"(arxiv|issn|www|http)", l, re.I):
+            continue
+        letters = sum(ch.isalpha() for ch in l)
+        digits = sum(ch.isdigit() for ch in l)
+        if letters > 2 * digits and len(l) > 5:
+            return l
+    return None
+
+def _year_from_text(text: str) -> Optional[int]:
+    """粗略年份候选：取文本中出现的最早合理年份。"""
+    years = [int(x) for x in re.findall(r"\b(?:19|20)\d{2}\b", text or "")]
+    years = [y for y in years if 1900 <= y <= (datetime.now().year + 1)]
+    return min(years) if years else None
+
+def _metadata_title(meta: Dict[str, Any]) -> Optional[str]:
+    """文档信息里的标题常是 'Microsoft Word - xxx.docx' 之类，只接受像样的。"""
+    t = (meta.get("title") or "").strip()
+    if len(t) < 10 or re.search(r"(\.(docx?|tex|dvi|pdf)$|^microsoft word|^untitled)", t, re.I):
+        return None
+    return t
+
+def _extract_pdf_hints(pdf_path: str, max_pages: int = 2, use_layout_cache: bool = False) -> Dict[str, Any]:
+    """
+    由便宜到昂贵分级提取线索，找到 DOI 或 arXiv ID 即停止：
+        filename: arXiv 默认文件名（如 2506.21611v2.pdf）
+        metadata: 文档信息字典与 XMP
+        links:    前几页的链接注释 / URI
+        margin:   首页左侧页边（arXiv 水印）
+        clip:     首页顶部区域的文本
+        layout:   前几页全文（只找 DOI）+ 首页版面分析（标题）
+    返回字段 tier 表示线索来自哪一级；arxiv_id 非空时联网解析走 arXiv 接口。
+    找到 ID 提前返回时仍补做首页顶部的标题 / 年份检测（裁剪区，代价很小），
+    以便 DOI 查不到时联网解析还能按标题搜索兜底。
+    use_layout_cache: 文本与标题检测都读写 PDF 旁的逐页版面缓存（见 layout_cache.py），
+                      同一文件再次解析时不再对页面做版面分析
+    """
+    with fitz.open(pdf_path) as doc, (PageLayoutCache(pdf_path) if use_layout_cache else nullcontext()) as layout:
+        n = min(max_pages, len(doc))
+        meta = doc.metadata or {}
+        title = _metadata_title(meta)
+        texts: List[str] = []
+        page0 = doc[0] if n else None
+        top: List[str] = []
+
+        def _top_text() -> str:
+            if not top:
+                r = page0.rect
+                top.append(_page_text(page0, layout, fitz.Rect(r.x0, r.y0, r.x1, r.y0 + _TOP_BAND * r.height)))
+            return top[0]
+
+        def _page0_title() -> Optional[str]:
+            return _extract_title_from_page(page0, layout)
+
+        def _done(doi: Optional[str], tier: str, arxiv_id: Optional[str] = None,
+                  early: bool = True) -> Dict[str, Any]:
+            nonlocal title
+            if early and page0 is not None:
+                texts.append(_top_text())
+                title = title or _page0_title() or _title_from_lines(_top_text())
+            sample = "\n".join(texts)
+            return {"doi": doi, "arxiv_id": arxiv_id, "title_hint": title,
+                    "year_hint": _year_from_text(sample), "text_sample": sample, "tier": tier}
+
+        # 0) 文件名
+        aid = _arxiv_id_from_filename(pdf_path)
+        if aid:
+            return _done(None, "filename", aid)
+
+        # 1) 文档信息 + XMP
+        try:
+            xmp = doc.get_xml_metadata() or ""
+        except Exception:
+            xmp = ""
+        texts.append(" ".join(str(meta.get(k) or "") for k in ("subject", "keywords", "title")))
+        doi = _detect_doi_in_text(texts[0] + "\n" + xmp)
+        aid = _detect_arxiv_id(texts[0] + "\n" + xmp)
+        if doi or aid:
+            return _done(doi, "metadata", aid)
+
+        # 2) 链接注释（很多出版社在首页放 https://doi.org/... 链接）
+        for i in range(n):
+            for link in doc[i].get_links():
+                uri = link.get("uri") or ""
+                low = uri.lower()
+                if "doi" in low:
+                    doi = _detect_doi_in_text(uri)
+                    if doi:
+                        return _done(doi, "links")
+                if "arxiv.org" in low:
+                    aid = _detect_arxiv_id(uri)
+                    if aid:
+                        return _done(None, "links", aid)
+
+        if n == 0:
+            return _done(None, "metadata")
+
+        # 3) 左侧页边：arXiv 竖排水印
+        r = page0.rect
+        margin = _page_text(page0, layout, fitz.Rect(r.x0, r.y0, r.x0 + 0.12 * r.width, r.y1))
+        aid = _detect_arxiv_id(margin)
+        if aid:
+            return _done(None, "margin", aid)
+
+        # 4) 首页顶部裁剪区文本
+        doi = _detect_doi_in_text(_top_text())
+        if doi:
+            return _done(doi, "clip")
+
+        # 5) 全文 + 版面分析
+        for i in range(n):
+            t = _page_text(doc[i], layout)
+            texts.append(t)
+            if doi is None:
+                doi = _detect_doi_in_text(t)
+        # 正文里的 arXiv ID 多半是引用的别的论文，不作为本文的 ID（只认文件名 / 元数据 / 链接 / 页边水印）
+        title = _page0_title() or title or _title_from_lines(texts[1])
+        return _done(doi, "layout", early=False)
+
+def extract_full_text(pdf_path: str, workers: int = 1, use_layout_cache: bool = False) -> Iterator[Tuple[int, str]]:
+    """
+    逐页产出 (页码, 文本)；workers > 1 时多进程并行提取，仍按页码顺序产出。
+    use_layout_cache: 顺序提取时读写逐页版面缓存（并行模式不使用，避免多进程同写一个文件）
+    """
+    if use_layout_cache and workers <= 1:
+        return _iter_text_cached(pdf_path)
+    return iter_pages_parallel(pdf_path, page_text, workers=workers)
+
+def _iter_text_cached(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    with PageLayoutCache(pdf_path) as layout, fitz.open(pdf_path) as doc:
+        for pno in range(len(doc)):
+            yield pno, layout.text(doc[pno])
+
+_HINT_FIELDS = ("doi", "arxiv_id", "title_hint", "year_hint", "tier")
+# 线索规则变化时换前缀，旧缓存不再命中：hint2 提前返回也带标题，hint3 不再从正文取 arXiv ID
+_HINT_PREFIX = "hint3:"
+
+def _hint_cache_key(pdf_path: str, full_hash: bool = False) -> str:
+    return _HINT_PREFIX + fingerprint(pdf_path, full=full_hash)
+
+def _cached_hints(pdf_path: str, hint_cache: Optional[MetaCache], full_hash: bool = False,
+                  use_layout_cache: bool = False) -> Dict[str, Any]:
+    """
+    带持久缓存的 _extract_pdf_hints：按文件内容指纹（默认大小 + 首尾块哈希，
+    full_hash=True 时为全文件哈希）缓存 doi / title_hint / year_hint，
+    文件未变时不再打开 PDF。需要调用方在结束时 hint_cache.flush()。
+    """
+    if hint_cache is None:
+        return _extract_pdf_hints(pdf_path, use_layout_cache=use_layout_cache)
+    key = _hint_cache_key(pdf_path, full_hash)
+    rec = hint_cache.get(key)
+    if rec is not None:
+        return dict(rec["hints"])
+    hints = _extract_pdf_hints(pdf_path, use_layout_cache=use_layout_cache)
+    hint_cache.put(key, {"hints": {k: hints.get(k) for k in _HINT_FIELDS}, "ts": time.time()})
+    return hints
 
 # ------------------ Crossref / doi.org 查询 ------------------
 
@@ -207,31 +391,45 @@ def _get_title_from_item(item: Dict[str, Any]) -> str:
     return (t[0] if t else "").strip()
 
 def _fetch_doi_via_doi_org(doi: str, contact_email: Optional[str]) -> Optional[Dict[str, Any]]:
+    return _doi_org_lookup(doi, contact_email)[0]
+
+def _doi_org_lookup(doi: str, contact_email: Optional[str]) -> Tuple[Optional[Dict[str, Any]], int]:
+    """返回 (CSL JSON, HTTP 状态码)；网络异常时状态码为 0。"""
     url = _DOI_BASE + doi
     headers = _headers(contact_email)
     headers["Accept"] = "application/vnd.citationstyles.csl+json"
     try:
         r = requests.get(url, timeout=(6, 12), headers=headers, allow_redirects=True)
         if r.status_code == 200:
-            return r.json()
+            return r.json(), 200
+        return None, r.status_code
     except Exception:
         pass
-    return None
+    return None, 0
 
 def _fetch_doi_via_crossref(doi: str, contact_email: Optional[str]) -> Optional[Dict[str, Any]]:
+    return _crossref_doi_lookup(doi, contact_email)[0]
+
+def _crossref_doi_lookup(doi: str, contact_email: Optional[str]) -> Tuple[Optional[Dict[str, Any]], int]:
+    """返回 (message, HTTP 状态码)；网络异常时状态码为 0。"""
     url = f"{_CROSSREF_API}/{requests.utils.quote(doi)}"
     try:
         r = requests.get(url, timeout=(6, 12), headers=_headers(contact_email))
         if r.status_code == 200:
-            return r.json().get("message")
+            return r.json().get("message"), 200
+        return None, r.status_code
     except Exception:
         pass
-    return None
+    return None, 0
 
-def _search_crossref_by_title(title: str, contact_email: Optional[str], rows: int = 5) -> List[Dict[str, Any]]:
+def _search_crossref_by_title(title: str, contact_email: Optional[str], rows: int = 5,
+                              lean: bool = False) -> List[Dict[str, Any]]:
+    """lean: 用 select= 做字段投影并要求压缩传输；结果不含摘要，需要时再 MetaResult.fetch_abstract()"""
     params = {"query.bibliographic": title, "rows": rows}
+    if lean:
+        params["select"] = _CROSSREF_SELECT
     try:
-        r = requests.get(_CROSSREF_API, params=params, timeout=(8, 15), headers=_headers(contact_email))
+        r = requests.get(_CROSSREF_API, params=params, timeout=(8, 15), headers=_headers(contact_email, lean))
         if r.status_code == 200:
             return r.json().get("message", {}).get("items", []) or []
     except Exception:
@@ -277,23 +475,70 @@ class MetaResult:
             url=self.url or (f"{_DOI_BASE}{self.doi}" if self.doi else ""),
         )
 
-def extract_and_fetch(pdf_path: str, contact_email: Optional[str] = None, polite_delay: float = 0.0) -> MetaResult:
+    def fetch_abstract(self, contact_email: Optional[str] = None) -> str:
+        """lean 模式下摘要按需获取：首次调用时按 DOI 单独查询 Crossref。"""
+        if not self.abstract and self.doi:
+            item = _fetch_doi_via_crossref(self.doi, contact_email)
+            if item:
+                self.abstract = _clean_abstract(item.get("abstract"))
+        return self.abstract
+
+def _result_from_meta(pdf_path: str, meta: Dict[str, Any], hint_title: str = "") -> MetaResult:
+    """meta_resolver 的统一字典 -> MetaResult。"""
+    title = meta.get("title") or ""
+    conf = _token_jaccard(hint_title, title) if hint_title else 1.0
+    return MetaResult(
+        pdf_path=pdf_path, title=title, year=meta.get("year"), container=meta.get("container") or "",
+        authors=meta.get("authors") or [], doi=meta.get("doi") or "", url=meta.get("url") or "",
+        abstract=meta.get("abstract") or "", source=meta.get("source") or "",
+        confidence=float(conf), hint_title=hint_title
+    )
+
+def extract_and_fetch(pdf_path: str, contact_email: Optional[str] = None, polite_delay: float = 0.0,
+                      unresolvable: Optional[UnresolvableFilter] = None, lean: bool = False,
+                      hint_cache: Optional[MetaCache] = None, use_layout_cache: bool = False) -> MetaResult:
     """
     主函数：对单个 PDF 提取元数据。
     polite_delay: 每次网络访问后的轻微 sleep，避免过快轮询（如 0.2 秒）
+    unresolvable: 已确认不存在的 DOI 的 Bloom 过滤器；命中则跳过 DOI 查询直接走标题搜索，
+                  doi.org 与 Crossref 都返回 404 时加入过滤器
+    lean: 标题搜索只取必要字段，摘要留空，需要时调用 MetaResult.fetch_abstract()
+    hint_cache: PDF 线索的持久缓存（按内容指纹），见 _cached_hints
+    use_layout_cache: 线索提取读写 PDF 旁的逐页版面缓存，同一文件再次解析时不再做版面分析
     """
-    hints = _extract_pdf_hints(pdf_path)
+    hints = _cached_hints(pdf_path, hint_cache, use_layout_cache=use_layout_cache)
+    return _resolve_from_hints(pdf_path, hints, contact_email, polite_delay, unresolvable, lean)
+
+def _resolve_from_hints(pdf_path: str, hints: Dict[str, Any], contact_email: Optional[str] = None,
+                        polite_delay: float = 0.0, unresolvable: Optional[UnresolvableFilter] = None,
+                        lean: bool = False) -> MetaResult:
+    """联网部分：由 _extract_pdf_hints 的结果查询元数据（批量导入时在 I/O 线程中调用）。"""
     doi = hints.get("doi")
     hint_title = hints.get("title_hint") or ""
 
+    # arXiv 快速通道：识别到 arXiv ID 时直接查 arXiv（有 DOI 时 meta_resolver 会再补全期刊信息）
+    aid = hints.get("arxiv_id")
+    if aid:
+        meta = get_metadata(url="arXiv:" + aid, contact_email=contact_email, unresolvable=unresolvable)
+        if polite_delay: time.sleep(polite_delay)
+        if meta.get("source") != "none":
+            return _result_from_meta(pdf_path, meta, hint_title)
+
+    if doi and unresolvable is not None and doi.lower() in unresolvable:
+        doi = None
+
     # 优先：有 DOI 则直取
     # 先试 doi.org，再退 Crossref
     if doi:
-        item = _fetch_doi_via_doi_org(doi, contact_email)
+        item, status = _doi_org_lookup(doi, contact_email)
         if polite_delay: time.sleep(polite_delay)
         if not item:
-            item = _fetch_doi_via_crossref(doi, contact_email)
+            doi_org_status = status
+            item, status = _crossref_doi_lookup(doi, contact_email)
             if polite_delay: time.sleep(polite_delay)
+            # 两处都确认 404 才记入过滤器，超时等情况不算
+            if doi_org_status == 404 and status == 404 and unresolvable is not None:
+                unresolvable.add(doi.lower())
         if item:
             # doi.org 返回的是 CSL JSON；Crossref message 结构稍不同，这里统一取字段
             title = (item.get("title") or (item.get("title", [""]) if isinstance(item.get("title"), list) else ""))  # 兼容
@@ -325,7 +570,7 @@ def extract_and_fetch(pdf_path: str, contact_email: Optional[str] = None, polite
 
     # 其次：按标题搜索 Crossref
     if hint_title:
-        items = _search_crossref_by_title(hint_title, contact_email, rows=5)
+        items = _search_crossref_by_title(hint_title, contact_email, rows=5, lean=lean)
         if polite_delay: time.sleep(polite_delay)
         best, score = _select_best_by_title(hint_title, items)
         if best:
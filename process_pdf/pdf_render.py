@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：pdf_render.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/20 17:30
+'''
+"""
+LPDF 的页面渲染：像素转 NumPy 的公共函数，以及后台渲染用的工作进程函数（不依赖 Qt，可被 pickle）。
+
+pixmap_array 直接把 pix.samples_mv（像素内存的视图）包装成 (高, 宽, 通道) 数组，不再经过
+getImageData("png") + cv2.imdecode 的编码 / 解码；需要 OpenCV 的 BGR 顺序时只做一次 cvtColor。
+
+每个工作进程自己打开文档并缓存句柄（PyMuPDF 的 Document 不能跨进程 / 线程共享），
+同一进程连续渲染同一文件时不重复打开；最多同时保留 _MAX_DOCS 个文件的句柄
+（插入过其他文件的文档，页面来自多个源文件）。文件被改写（如增量保存）后按修改时间重新打开。
+给出 cache_path 时顺便把 JPEG 压缩后的缩略图写进磁盘缓存（见 thumb_cache）。
+
+export_jpegs 是“导出”的多进程引擎：所选页面按 chunk 分块交给工作进程，
+每块在进程内渲染、编码、写盘，主进程只收进度，可随时取消。
+
+compress_pages 是“压缩”的流式引擎：工作进程并行渲染 + JPEG 编码，主进程按页序把 JPEG
+直接作为页面图片插入新文档（不再 jpg -> convert_to_pdf -> insert_pdf），
+每 batch 页增量保存一次并释放，内存占用与总页数无关。
+
+recompress_images 是“压缩”的仅图片模式：不栅格化页面，只把显示分辨率超过 dpi、
+体积超过 min_bytes 的嵌入图片并行缩小并重新编码成 JPEG，文字与矢量原样保留，
+最后用 garbage 回收 + deflate 保存。
+"""
+import os
+import math
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+import thumb_cache
+
+_CACHE_QUALITY = 85
+
+
+def pixmap_array(pix: fitz.Pixmap) -> np.ndarray:
+    """
+    pix 像素内存（pix.samples_mv）上的只读视图，形状 (高, 宽, 通道数)，不复制像素。
+    视图不持有 pix：pix 释放后数组即失效，调用方须在 pix 存活期间用完，要留下结果时先转换 / 复制。
+    """
+    arr = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    arr.flags.writeable = False
+    if pix.stride != pix.width * pix.n:
+        arr = arr[:, :pix.width * pix.n]  # 行尾有填充时才会在 reshape 时复制
+    return arr.reshape(pix.height, pix.width, pix.n)
+
+
+def render_pixmap(page: fitz.Page, zoom: float) -> fitz.Pixmap:
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+
+def pixmap_bgr(pix: fitz.Pixmap) -> np.ndarray:
+    """转成 OpenCV 使用的 3 通道 BGR 数组（与原先 cv2.imdecode(IMREAD_ANYCOLOR) 的结果一致）；cvtColor 产出新数组，可比 pix 活得久。"""
+    code = cv2.COLOR_GRAY2BGR if pix.n == 1 else cv2.COLOR_RGB2BGR
+    return cv2.cvtColor(pixmap_array(pix), code)
+
+
+def render_bgr(page: fitz.Page, zoom: float) -> np.ndarray:
+    return pixmap_bgr(render_pixmap(page, zoom))
+
+
+def _encode_array(arr: np.ndarray, quality: int) -> bytes:
+    """RGB / 灰度数组编码成 JPEG；灰度不做通道转换。"""
+    if arr.shape[2] != 1:
+        arr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+    ok, buf = cv2.imencode(".jpg", arr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG 编码失败")
+    return buf.tobytes()
+
+
+def encode_jpeg(pix: fitz.Pixmap, quality: int) -> bytes:
+    """直接从像素编码 JPEG。"""
+    return _encode_array(pixmap_array(pix), quality)
+
+
+_MAX_DOCS = 4
+_DOCS: "OrderedDict[str, Tuple[Tuple[int, int], fitz.Document]]" = OrderedDict()  # 路径 -> (文件状态, 文档)，每个进程一份
+
+
+def _open(path: str) -> fitz.Document:
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    entry = _DOCS.get(path)
+    if entry is not None and entry[0] != stamp:
+        # 文件已被改写：旧句柄看到的还是旧的页面结构
+        del _DOCS[path]
+        entry[1].close()
+        entry = None
+    if entry is None:
+        doc = fitz.open(path)
+        _DOCS[path] = (stamp, doc)
+        while len(_DOCS) > _MAX_DOCS:
+            _DOCS.popitem(last=False)[1][1].close()
+    else:
+        doc = entry[1]
+        _DOCS.move_to_end(path)
+    return doc
+
+
+def _load(path: str, pagenum: int, rotation: int) -> fitz.Page:
+    page = _open(path)[pagenum]
+    if page.rotation != rotation:
+        page.set_rotation(rotation)
+    return page
+
+
+def render_page(path: str, pagenum: int, rotation: int, zoom: float,
+                cache_path: Optional[str] = None) -> Tuple[int, int, int, bytes]:
+    """按给定旋转角度与缩放渲染一页，返回 (宽, 高, stride, RGB 像素)。"""
+    pix = render_pixmap(_load(path, pagenum, rotation), zoom)
+    if cache_path:
+        thumb_cache.put(cache_path, encode_jpeg(pix, _CACHE_QUALITY))
+    return pix.width, pix.height, pix.stride, pix.samples
+
+
+def _export_chunk(path: str, jobs: List[Tuple[int, int]], zoom: float, quality: int, outdir: str) -> int:
+    for pagenum, rotation in jobs:
+        data = encode_jpeg(render_pixmap(_load(path, pagenum, rotation), zoom), quality)
+        # 用 open 写字节而不是 cv2.imwrite，Windows 下中文路径也能写
+        with open(os.path.join(outdir, "%04d.jpg" % pagenum), "wb") as f:
+            f.write(data)
+    return len(jobs)
+
+
+def export_jpegs(path: str, jobs: Sequence[Tuple[int, int]], zoom: float, quality: int, outdir: str,
+                 workers: Optional[int] = None, chunk: int = 4,
+                 cancelled: Callable[[], bool] = lambda: False) -> Iterator[int]:
+    """
+    把 jobs = [(页码, 旋转角度), ...] 渲染成 outdir/<页码>.jpg。
+    产出已完成的页数；没有新进度时每隔约 0.1 秒也产出一次，调用方可借机刷新界面。
+    cancelled() 返回 True 后不再提交新的块，未开始的块取消，正在处理的块做完即停。
+    """
+    chunks = iter([list(jobs[i:i + chunk]) for i in range(0, len(jobs), chunk)])
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = set()
+        try:
+            while True:
+                while len(window) < 2 * workers and not cancelled():
+                    nxt = next(chunks, None)
+                    if nxt is None:
+                        break
+                    window.add(pool.submit(_export_chunk, path, nxt, zoom, quality, outdir))
+                if not window:
+                    break
+                finished, window = wait(window, timeout=0.1, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    if not fut.cancelled():
+                        done += fut.result()
+                yield done
+                if cancelled():
+                    for fut in window:
+                        fut.cancel()
+        finally:
+            for fut in window:
+                fut.cancel()
+
+
+def _compress_chunk(path: str, jobs: List[Tuple[int, int]], zoom: float, quality: int
+                    ) -> List[Tuple[float, float, bytes]]:
+    out = []
+    for pagenum, rotation in jobs:
+        page = _load(path, pagenum, rotation)
+        # 输出页保持原页面尺寸（page.rect 已计入旋转），图片分辨率由 zoom 决定
+        out.append((page.rect.width, page.rect.height, encode_jpeg(render_pixmap(page, zoom), quality)))
+    return out
+
+
+class _BatchWriter:
+    """先写到 <outfile>.part：首批完整保存，之后每批重新打开并增量保存，全部完成后再改名。"""
+
+    def __init__(self, outfile: str, batch: int):
+        self.outfile = outfile
+        self.part = outfile + ".part"
+        self.batch = batch
+        self.doc = fitz.open()
+        self.pending = 0
+        self.saved = False
+
+    def add(self, width: float, height: float, jpg: bytes) -> None:
+        page = self.doc.new_page(width=width, height=height)
+        page.insert_image(page.rect, stream=jpg)
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.saved:
+            self.doc.saveIncr()
+        else:
+            self.doc.save(self.part)
+            self.saved = True
+        self.doc.close()
+        self.doc = fitz.open(self.part)
+        self.pending = 0
+
+    def close(self) -> None:
+        if self.pending or not self.saved:
+            self.flush()
+        self.doc.close()
+        os.replace(self.part, self.outfile)
+
+    def abort(self) -> None:
+        self.doc.close()
+        try:
+            os.remove(self.part)
+        except OSError:
+            pass
+
+
+def compress_pages(path: str, jobs: Sequence[Tuple[int, int]], zoom: float, quality: int, outfile: str,
+                   workers: Optional[int] = None, chunk: int = 4, batch: int = 64,
+                   cancelled: Callable[[], bool] = lambda: False) -> Iterator[int]:
+    """
+    把 jobs = [(页码, 旋转角度), ...] 依次渲染成 JPEG 页面写入 outfile。
+    进度产出方式与 export_jpegs 相同；取消后删除未完成的输出文件。
+    在途的块最多 2 * workers 个，按提交顺序取结果以保证页序。
+    """
+    chunks = iter([list(jobs[i:i + chunk]) for i in range(0, len(jobs), chunk)])
+    workers = workers or os.cpu_count() or 1
+    writer = _BatchWriter(outfile, batch)
+    done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            window = deque()
+            try:
+                while not cancelled():
+                    while len(window) < 2 * workers:
+                        nxt = next(chunks, None)
+                        if nxt is None:
+                            break
+                        window.append(pool.submit(_compress_chunk, path, nxt, zoom, quality))
+                    if not window:
+                        break
+                    finished, _ = wait([window[0]], timeout=0.1)
+                    if finished:
+                        for width, height, jpg in window.popleft().result():
+                            writer.add(width, height, jpg)
+                            done += 1
+                    yield done
+            finally:
+                for fut in window:
+                    fut.cancel()
+        if cancelled():
+            writer.abort()
+        else:
+            writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+_SKIP_FILTERS = {"JBIG2Decode", "CCITTFaxDecode"}  # 二值扫描件，JPEG 只会更大更糊
+
+
+def _recompress_image(path: str, xref: int, scale: float, quality: int) -> Optional[Tuple[int, int, int, bytes]]:
+    """缩小并重新编码一张图片，返回 (宽, 高, 通道数, JPEG)；结果不比原来小时返回 None。"""
+    doc = _open(path)
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)  # 透明度在单独的 SMask 里，这里只处理底图
+    if pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)  # CMYK / 其他色彩空间
+    arr = pixmap_array(pix)
+    width, height = max(1, round(pix.width * scale)), max(1, round(pix.height * scale))
+    if scale < 1:
+        arr = cv2.resize(arr, (width, height), interpolation=cv2.INTER_AREA).reshape(height, width, pix.n)
+    data = _encode_array(arr, quality)
+    if len(data) >= len(doc.xref_stream_raw(xref)):
+        return None
+    return width, height, pix.n, data
+
+
+def _stream_length(doc: fitz.Document, xref: int) -> int:
+    """图片流的压缩后字节数；/Length 常写成间接对象（"12 0 R"），需要解引用。"""
+    kind, value = doc.xref_get_key(xref, "Length")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return len(doc.xref_stream_raw(xref) or b"")
+
+
+def _image_scales(doc: fitz.Document, dpi: float, min_bytes: int) -> dict:
+    """xref -> 缩放比例。同一图片出现在多处时按显示得最大的一处计算。"""
+    scales = {}
+    skipped = set()
+    for page in doc:
+        for info in page.get_images(full=True):
+            xref, width, height, bpc, filt = info[0], info[2], info[3], info[4], info[8]
+            if xref in skipped or not width or not height:
+                continue
+            if bpc == 1 or filt in _SKIP_FILTERS:
+                skipped.add(xref)
+                continue
+            if xref not in scales and _stream_length(doc, xref) < min_bytes:
+                skipped.add(xref)
+                continue
+            for rect in page.get_image_rects(xref) or [page.rect]:
+                if rect.is_empty:
+                    continue
+                # 显示分辨率 = 像素数 / 显示尺寸（英寸）；按面积算，图片旋转放置时也不受影响
+                shown = 72 * math.sqrt(width * height / (rect.width * rect.height))
+                scales[xref] = max(scales.get(xref, 0.0), min(1.0, dpi / shown))
+    return {xref: scale for xref, scale in scales.items() if scale < 1.0}
+
+
+def recompress_images(path: str, jobs: Sequence[Tuple[int, int]], dpi: float, quality: int, outfile: str,
+                      min_bytes: int = 32 * 1024, workers: Optional[int] = None,
+                      cancelled: Callable[[], bool] = lambda: False) -> Iterator[Tuple[int, int]]:
+    """
+    只保留 jobs = [(页码, 旋转角度), ...] 中的页，把超过 dpi 的图片缩小后另存为 outfile。
+    产出 (已处理图片数, 图片总数)；取消时不写输出文件。
+    """
+    doc = fitz.open(path)
+    try:
+        pages = [pagenum for pagenum, _ in jobs]
+        if pages != list(range(doc.page_count)):
+            doc.select(pages)
+        for i, (_, rotation) in enumerate(jobs):
+            if doc[i].rotation != rotation:
+                doc[i].set_rotation(rotation)
+        scales = _image_scales(doc, dpi, min_bytes)
+        todo = iter(scales.items())
+        done, total = 0, len(scales)
+        yield done, total
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            window = {}
+            try:
+                while not cancelled():
+                    while len(window) < 2 * workers:
+                        nxt = next(todo, None)
+                        if nxt is None:
+                            break
+                        window[pool.submit(_recompress_image, path, nxt[0], nxt[1], quality)] = nxt[0]
+                    if not window:
+                        break
+                    finished, _ = wait(window, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        xref = window.pop(fut)
+                        res = fut.result()
+                        if res is not None:
+                            _replace_image(doc, xref, *res)
+                        done += 1
+                    yield done, total
+            finally:
+                for fut in window:
+                    fut.cancel()
+        if cancelled():
+            return
+        part = outfile + ".part"
+        doc.save(part, garbage=3, deflate=True)
+        doc.close()
+        os.replace(part, outfile)
+    finally:
+        if not doc.is_closed:
+            doc.close()
+
+
+def _replace_image(doc: fitz.Document, xref: int, width: int, height: int, n: int, data: bytes) -> None:
+    doc.update_stream(xref, data, compress=False)  # JPEG 本身已压缩，不再 deflate
+    doc.xref_set_key(xref, "Filter", "/DCTDecode")
+    doc.xref_set_key(xref, "Width", str(width))
+    doc.xref_set_key(xref, "Height", str(height))
+    doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if n == 1 else "/DeviceRGB")
+    doc.xref_set_key(xref, "BitsPerComponent", "8")
+    for key in ("DecodeParms", "Decode"):
+        doc.xref_set_key(xref, key, "null")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：pdf_text.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/20 9:40
+'''
+"""
+长文档（学位论文、书籍）的多进程逐页提取。
+
+页码范围按 chunk 切块分给工作进程，每个进程自己打开文档（PyMuPDF 的 Document
+不能跨进程共享），结果按页码顺序合并后流式产出。同时在途的块数不超过
+2 * workers，因此峰值内存取决于进程数而不是页数。
+
+page_fn 需要是模块顶层函数（可被 pickle），签名为 page_fn(page: fitz.Page) -> 任意结果。
+
+用法：
+    from pdf_text import iter_pages_parallel, page_text
+    for pno, text in iter_pages_parallel("thesis.pdf", page_text, workers=4):
+        ...
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional
+
+import fitz  # PyMuPDF
+
+_MIN_PAGES = 32  # 页数较少时多进程的启动开销不划算，直接顺序处理
+
+
+def page_text(page: fitz.Page):
+    """默认的逐页函数：返回 (页码, 纯文本)。"""
+    return page.number, page.get_text("text") or ""
+
+
+def _work(pdf_path: str, start: int, stop: int, page_fn: Callable[[fitz.Page], Any]) -> List[Any]:
+    with fitz.open(pdf_path) as doc:
+        return [page_fn(doc[i]) for i in range(start, stop)]
+
+
+def iter_pages_parallel(pdf_path: str, page_fn: Callable[[fitz.Page], Any] = page_text,
+                        workers: Optional[int] = None, chunk: int = 8,
+                        start: int = 0, stop: Optional[int] = None) -> Iterator[Any]:
+    """
+    按页码顺序产出 page_fn 对 [start, stop) 每一页的结果。
+    workers: 进程数，默认 CPU 核数；<= 1 或页数少于 _MIN_PAGES 时在当前进程顺序执行
+    chunk: 每个任务处理的连续页数
+    """
+    with fitz.open(pdf_path) as doc:
+        total = len(doc)
+        stop = total if stop is None else min(stop, total)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or stop - start < _MIN_PAGES:
+            for i in range(start, stop):
+                yield page_fn(doc[i])
+            return
+
+    ranges = iter([(i, min(i + chunk, stop)) for i in range(start, stop, chunk)])
+    window = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            for rg in ranges:
+                window.append(pool.submit(_work, pdf_path, rg[0], rg[1], page_fn))
+                if len(window) >= 2 * workers:
+                    break
+            while window:
+                results = window.popleft().result()
+                nxt = next(ranges, None)
+                if nxt is not None:
+                    window.append(pool.submit(_work, pdf_path, nxt[0], nxt[1], page_fn))
+                yield from results
+        finally:
+            for fut in window:
+                fut.cancel()
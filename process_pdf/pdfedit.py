@@ -7,7 +7,11 @@
 @Author  ：wei liyu
 @Date    ：2025/10/30 9:04 
 '''
+import os
 import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5 import QtCore
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import *
@@ -19,11 +23,36 @@ import fitz
 # from fitz.fitz import linkDest
 import numpy as np
 import cv2
+
+import thumb_cache
+from file_hash import quick_fingerprint
+from pdf_render import render_page, render_bgr, export_jpegs, compress_pages, recompress_images
 # from numpy.lib.function_base import append, select
 # from numpy.lib.npyio import load
 
 main = {}
 
+THUMB_MARGIN = 8  # 可视区域前后额外预渲染的页数
+THUMB_BUDGET = 200 * 1024 * 1024  # 缩略图内存上限（字节），超出后淘汰最久未显示的页
+THUMB_PREVIEW_ZOOM = 0.25  # 先出低分辨率预览，再替换成清晰图
+THUMB_ZOOM = 1.0
+THUMB_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # 留一个核给界面
+THUMB_CACHE_DIR = thumb_cache.default_dir()  # 清晰缩略图的磁盘缓存，重新打开同一文件时直接读取
+THUMB_CACHE_BYTES = thumb_cache.DEFAULT_MAX_BYTES
+OPTIMIZE_CACHE_BUDGET = 512 * 1024 * 1024  # 优化工具中间结果的内存上限（字节）
+
+
+def ArrayToPixmap(img):
+    # OpenCV 数组直接转 QPixmap，不再经过 JPEG 编码 / 解码
+    if img.ndim == 2:
+        img = np.require(img, requirements=["C", "W"])  # 缓存的中间结果是只读的，给 QImage 一份可写的
+        fmt = QImage.Format_Grayscale8
+    else:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        fmt = QImage.Format_RGB888
+    height, width = img.shape[:2]
+    return QPixmap.fromImage(QImage(img.data, width, height, img.strides[0], fmt))
+
 
 class singlesilder(QWidget):  # 单控制条的窗口
     def __init__(self, num, slider1start, slider1end, windowtitle):
@@ -372,6 +401,11 @@ class OptimizeWindow(QWidget):  # 优化工具窗口
         toolBar.addAction(toolButton1)
         # 处理列表 得有开关选项 双击进入gui修改模式，修改后自动向下计算 多个gui可以同时控制图片
         self.imgcachelist = {}  # 图片处理中间文件
+        # 增量计算：每个中间文件记录它的来源键（命令参数 + 上游键），命令结果按键缓存，
+        # 调某一步参数时上游都命中缓存，只重算受影响的下游
+        self.slotkeys = {}
+        self.nodecache = OrderedDict()  # 键 -> 结果，按最近使用排序
+        self.nodebytes = 0
         toolButton2 = QAction(text="载入预设", parent=self)
         toolBar.addAction(toolButton2)
         # 预设从文件中读取查询文件夹举出所有文件
@@ -400,10 +434,7 @@ class OptimizeWindow(QWidget):  # 优化工具窗口
             self.imgtodolistwindow.show()
 
     def LoadFromSelect(self):
-        select = main["self"].listWidget.selectedItems()
-        self.pagenumlist = []
-        for i in select:
-            self.pagenumlist.append(main["self"].listWidget.row(i))
+        self.pagenumlist = main["self"].listWidget.SelectedPages()
         self.slider1.setRange(0, len(self.pagenumlist) - 1)
         self.LoadImg(self.pagenumlist[0])
 
@@ -488,34 +519,65 @@ class OptimizeWindow(QWidget):  # 优化工具窗口
             self.DoErode(vaule, command[2], command[3])
         elif cmd[0] == "显示图片":
             self.DoShowImg(command[2], command[3])
-        None
+        else:
+            return False  # 未支持的命令（如 floodFill）：不执行，目标中间文件不变
+        return True
 
     def todoCommand(self):
         # 获取序列数据
         commandlist = []
         for i in range(main["ImgTodoListWindow"].commandlist.count()):
             commandlist.append(main["ImgTodoListWindow"].GetCommand(i))
-        # 匹配执行命令
+        # 匹配执行命令：按 来源 -> 目标 中间文件连成依赖图，键没变的命令直接取缓存
         for i in range(0, len(commandlist)):
             if commandlist[i][0] == True:
-                self.linkstart(commandlist[i], i)
+                command = commandlist[i]
+                if command[1].split(":")[0] == "显示图片":
+                    self.linkstart(command, i)  # 只是切换显示，不用缓存
+                    self.slotkeys[command[3]] = self.slotkeys.get(command[2])
+                    continue
+                upstream = self.slotkeys.get(command[2])
+                if upstream is None:
+                    # 来源不明（没有经过 LoadImg 载入），不缓存，下游也跟着不缓存
+                    self.linkstart(command, i)
+                    self.slotkeys[command[3]] = None
+                    continue
+                key = (command[1], upstream)
+                if key in self.nodecache:
+                    self.nodecache.move_to_end(key)
+                    self.imgcachelist[command[3]] = self.nodecache[key]
+                else:
+                    if not self.linkstart(command, i) or command[3] not in self.imgcachelist:
+                        # 命令没有执行，目标里是旧结果（或没有），不能按这个键缓存
+                        self.slotkeys[command[3]] = None
+                        continue
+                    self.CacheNode(key, self.imgcachelist[command[3]])
+                self.slotkeys[command[3]] = key
+
+    def CacheNode(self, key, img):
+        # 缓存的数组会被多个中间文件共用（命中时按引用取出），设为只读防止被原地修改
+        img.flags.writeable = False
+        self.nodecache[key] = img
+        self.nodebytes += img.nbytes
+        while self.nodebytes > OPTIMIZE_CACHE_BUDGET and len(self.nodecache) > 1:
+            self.nodebytes -= self.nodecache.popitem(last=False)[1].nbytes
 
     def LoadImg(self, num):
-        img = QPixmap()
         imgdata = main["self"].GetPageToData(num)
         self.imgcachelist[self.defLoadimg] = imgdata
+        # 来源键：页面 id + 旋转角度，插入删除页面后仍然对应同一页
+        self.slotkeys[self.defLoadimg] = ("page", main["self"].pages[num][0], main["self"].doc[num].rotation)
         # 执行函数序列
         self.todoCommand()
 
-        img.loadFromData(np.array(cv2.imencode('.jpg', self.imgcachelist[self.defLoadimg])[1]).tobytes())
+        img = ArrayToPixmap(self.imgcachelist[self.defLoadimg])
         secen = QGraphicsScene()
         secen.addPixmap(img)
         self.picview.setScene(secen)
 
     def MakeImg(self):
         self.todoCommand()
-        img = QPixmap()
-        img.loadFromData(np.array(cv2.imencode('.jpg', self.imgcachelist[self.defLoadimg])[1]).tobytes())
+        img = ArrayToPixmap(self.imgcachelist[self.defLoadimg])
         secen = QGraphicsScene()
         secen.addPixmap(img)
         self.picview.setScene(secen)
@@ -626,16 +688,33 @@ class MergeListWindow(QWidget):  # 合并工具 列表窗口
 
 
 class ProgressWindow(QWidget):  # 进度条
-    def __init__(self):
+    def __init__(self, cancelable=False):
         super(ProgressWindow, self).__init__()
         layout = QGridLayout()
+        self.setLayout(layout)
         self.setWindowTitle("进度")
         self.progress1 = QProgressBar(self)
         self.progress1.resize(500, 30)
         self.resize(500, 30)
-        layout.addWidget(self.progress1)
+        layout.addWidget(self.progress1, 0, 0)
+        self.cancelled = False
+        if cancelable:
+            button1 = QPushButton()
+            button1.setText("取消")
+            button1.clicked.connect(self.Cancel)
+            layout.addWidget(button1, 0, 1)
         self.show()
 
+    def Cancel(self):
+        self.cancelled = True
+
+    def IsCancelled(self):
+        return self.cancelled
+
+    def closeEvent(self, event):
+        self.cancelled = True
+        super().closeEvent(event)
+
     def SetRange(self, startvalue, endvalue):
         self.progress1.setMinimum(startvalue)
         self.progress1.setMaximum(endvalue)
@@ -692,20 +771,30 @@ class OutputOption(QWidget):  # 导出压缩使用的设置窗口
         layout.addWidget(self.label3, 4, 0, 1, 1)
         layout.addWidget(button3, 4, 1, 1, 1)
 
+        # 仅压缩图片：不栅格化页面，文字可选中；缩放倍率换算成图片分辨率上限（72dpi x 倍率）
+        self.check1 = QCheckBox()
+        self.check1.setText("仅压缩图片（保留文字）")
+        self.check1.stateChanged.connect(self.slider1changed)
+        self.check1.setVisible(False)
+        layout.addWidget(self.check1, 5, 0, 1, 2)
+
         button1 = QPushButton()
         button1.setText("取消")
         button1.clicked.connect(self.buttonCancel)
-        layout.addWidget(button1, 5, 0, 1, 1)
+        layout.addWidget(button1, 6, 0, 1, 1)
 
         button2 = QPushButton()
         button2.setText("确定")
         button2.clicked.connect(self.buttonAccept)
-        layout.addWidget(button2, 5, 1, 1, 1)
+        layout.addWidget(button2, 6, 1, 1, 1)
 
         self.show()
 
     def slider1changed(self):
-        self.label1.setText("页面缩放倍率:" + str(self.slider1.value() / 10))
+        if self.check1.isChecked():
+            self.label1.setText("图片分辨率上限:%ddpi" % (72 * self.slider1.value() / 10))
+        else:
+            self.label1.setText("页面缩放倍率:" + str(self.slider1.value() / 10))
 
     def slider2changed(self):
         self.label2.setText("页面图像质量:" + str(self.slider2.value()))
@@ -721,8 +810,7 @@ class OutputOption(QWidget):  # 导出压缩使用的设置窗口
         if self.mode == "导出":
             main["self"].OnOutPut(zoom, mase, savefile)
         elif self.mode == "压缩":
-            main["self"].OnOutZip(zoom, mase, savefile)
-            None
+            main["self"].OnOutZip(zoom, mase, savefile, self.check1.isChecked())
         self.close()
 
     def buttonCancel(self):
@@ -732,6 +820,7 @@ class OutputOption(QWidget):  # 导出压缩使用的设置窗口
     def dateUpdate(self, zoom, mase, mode):
         self.mode = mode
         self.setWindowTitle(mode + "设置")
+        self.check1.setVisible(mode == "压缩")
         self.slider1.setValue(zoom)
         self.slider2.setValue(mase)
         self.slider1changed()
@@ -755,17 +844,280 @@ class OutputOption(QWidget):  # 导出压缩使用的设置窗口
             self.label3.setPalette(self.palette);
 
 
-class ListWidget(QListWidget):
+class ThumbRenderer(QObject):  # 后台缩略图渲染
+    # 代次, 页面 id, 旋转角度, 缩放, (宽, 高, stride, 像素)
+    rendered = pyqtSignal(int, int, int, float, object)
+
+    def __init__(self, workers=THUMB_WORKERS):
+        super(ThumbRenderer, self).__init__()
+        self.workers = workers
+        self.pool = None
+        self.generation = 0
+        self.jobs = {}  # (页面 id, 旋转, 缩放) -> Future，只在界面线程读写
+        self.fingerprints = {}  # 源文件 -> 指纹，磁盘缓存的 key；临时文件记为 None，不缓存
+        self.tmpfiles = []
+        self.snapshot = None  # 当前页面结构的整份快照，导出 / 压缩用，结构变化后作废
+        self.trimmed = False
+
+    def Reset(self):
+        # 打开新文档时调用：作废所有在途任务，删除上一个文档的临时文件
+        self.Cancel()
+        self.RemoveTmp()
+        self.fingerprints.clear()
+        if not self.trimmed:
+            # 每次运行清理一次磁盘缓存，放在工作进程里做，不占界面线程
+            self.trimmed = True
+            self.Pool().submit(thumb_cache.trim, THUMB_CACHE_DIR, THUMB_CACHE_BYTES)
+
+    def Pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def AddTmp(self, data):
+        # 图片转成的 PDF、文档快照等只在内存里的内容，写成临时文件给工作进程读
+        fd, path = tempfile.mkstemp(prefix="lpdf-", suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.tmpfiles.append(path)
+        self.fingerprints[path] = None
+        return path
+
+    def Snapshot(self, doc):
+        if self.snapshot is None:
+            self.snapshot = self.AddTmp(doc.tobytes())
+        return self.snapshot
+
+    def Invalidate(self):
+        # 删除 / 插入页面后调用；旧快照可能还在被工作进程读，等 Reset / Close 时再删
+        self.snapshot = None
+
+    def Rewritten(self, path):
+        # 源文件被就地改写（增量保存）：在途任务读的可能是改写中的文件，指纹也已变化
+        self.Cancel()
+        self.fingerprints.pop(path, None)
+        self.snapshot = None
+
+    def Fingerprint(self, path):
+        if path not in self.fingerprints:
+            try:
+                self.fingerprints[path] = quick_fingerprint(path)
+            except OSError:
+                self.fingerprints[path] = None
+        return self.fingerprints[path]
+
+    def CachePath(self, src, rotation, zoom):
+        fingerprint = self.Fingerprint(src[0])
+        if fingerprint is None:
+            return None
+        return thumb_cache.entry_path(THUMB_CACHE_DIR, fingerprint, src[1], rotation, zoom)
+
+    def Cached(self, src, rotation, zoom):
+        path = self.CachePath(src, rotation, zoom)
+        return thumb_cache.get(path) if path else None
+
+    def Request(self, uid, src, rotation, zoom):
+        # src = (源文件, 源文件中的页码)
+        key = (uid, rotation, zoom)
+        if key in self.jobs:
+            return
+        # 只缓存清晰图，预览重新渲染比读盘还快
+        cache_path = self.CachePath(src, rotation, zoom) if zoom >= THUMB_ZOOM else None
+        fut = self.Pool().submit(render_page, src[0], src[1], rotation, zoom, cache_path)
+        self.jobs[key] = fut
+        gen = self.generation
+        fut.add_done_callback(lambda f: self._done(f, gen, key))
+
+    def _done(self, fut, gen, key):
+        # 在线程池的回调线程中执行，经排队连接把结果交回界面线程
+        if fut.cancelled():
+            return
+        try:
+            res = fut.result()
+        except Exception:
+            res = None
+        self.rendered.emit(gen, key[0], key[1], key[2], res)
+
+    def Done(self, key):
+        self.jobs.pop(key, None)
+
+    def CancelExcept(self, uids):
+        # 滚出预渲染范围的页：还没开始的任务直接取消
+        for key in list(self.jobs):
+            if key[0] not in uids and self.jobs[key].cancel():
+                del self.jobs[key]
+
+    def CancelPage(self, uid):
+        for key in list(self.jobs):
+            if key[0] == uid:
+                self.jobs.pop(key).cancel()
+
+    def Cancel(self):
+        self.generation += 1
+        for fut in self.jobs.values():
+            fut.cancel()
+        self.jobs.clear()
+
+    def RemoveTmp(self):
+        for path in self.tmpfiles:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.tmpfiles = []
+        self.snapshot = None
+
+    def Close(self):
+        self.Cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+        self.RemoveTmp()
+
+
+PAGE_MIME = "application/x-lpdf-pages"
+
+
+class PageModel(QAbstractListModel):  # 页面列表模型：每行只存页面 id，缩略图由委托按需绘制
+    def __init__(self, window):
+        super(PageModel, self).__init__()
+        self.window = window
+        self.order = []  # 显示顺序（拖动排序后可以与页码顺序不同）
+        self.rows = {}  # 页面 id -> 行
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        uid = self.order[index.row()]
+        if role == Qt.DisplayRole:
+            return str(self.window.uidpage[uid] + 1)
+        if role == Qt.UserRole:
+            return uid
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction | Qt.CopyAction
+
+    def mimeTypes(self):
+        return [PAGE_MIME]
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        data.setData(PAGE_MIME, ",".join(str(i.row()) for i in indexes).encode())
+        return data
+
+    def Reindex(self):
+        self.rows = {uid: row for row, uid in enumerate(self.order)}
+
+    def Reset(self, uids):
+        self.beginResetModel()
+        self.order = list(uids)
+        self.Reindex()
+        self.endResetModel()
+
+    def InsertPages(self, row, uids):
+        if not uids:
+            return
+        self.beginInsertRows(QModelIndex(), row, row + len(uids) - 1)
+        self.order[row:row] = uids
+        self.Reindex()
+        self.endInsertRows()
+
+    def RemovePages(self, uids):
+        # 连续的行一次移除，从后往前删，前面的行号不受影响
+        rows = sorted((self.rows[uid] for uid in uids), reverse=True)
+        i = 0
+        while i < len(rows):
+            last = first = rows[i]
+            i += 1
+            while i < len(rows) and rows[i] == first - 1:
+                first = rows[i]
+                i += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.order[first:last + 1]
+            self.endRemoveRows()
+        self.Reindex()
+
+    def MoveRows(self, rows, target):
+        # 拖动排序：把 rows 移到 target 行之前（target 为 -1 时移到末尾），保持选中状态
+        moving = [self.order[row] for row in sorted(rows)]
+        if target < 0:
+            target = len(self.order)
+        target -= sum(1 for row in rows if row < target)
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        olduids = [self.order[i.row()] for i in old]
+        moving_set = set(moving)
+        rest = [uid for uid in self.order if uid not in moving_set]
+        self.order = rest[:target] + moving + rest[target:]
+        self.Reindex()
+        self.changePersistentIndexList(old, [self.index(self.rows[uid]) for uid in olduids])
+        self.layoutChanged.emit()
+
+    def PageChanged(self, uid):
+        row = self.rows.get(uid)
+        if row is not None:
+            self.dataChanged.emit(self.index(row), self.index(row))
+
+    def Relabel(self):
+        if self.order:
+            self.dataChanged.emit(self.index(0), self.index(len(self.order) - 1), [Qt.DisplayRole])
+
+
+class PageDelegate(QStyledItemDelegate):  # 画缩略图和页码；没有缩略图的页先画占位并通知渲染
+    def paint(self, painter, option, index):
+        view = self.parent()
+        size = view.iconSize()
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        pixmap = main["self"].ThumbPixmap(index.data(Qt.UserRole))
+        box = QRect(option.rect.left() + 4, option.rect.top() + 4, size.width(), size.height())
+        if pixmap is None:
+            painter.fillRect(box, QColor(235, 235, 235))
+        else:
+            target = pixmap.size().scaled(size, Qt.KeepAspectRatio)
+            rect = QRect(0, 0, target.width(), target.height())
+            rect.moveCenter(box.center())
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawPixmap(rect, pixmap)
+        if option.state & QStyle.State_Selected:
+            painter.setPen(option.palette.highlightedText().color())
+        text = QRect(option.rect.left(), box.bottom() + 2, option.rect.width(), option.fontMetrics.height())
+        painter.drawText(text, Qt.AlignCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = self.parent().iconSize()
+        return QSize(size.width() + 8, size.height() + option.fontMetrics.height() + 10)
+
+
+class ListWidget(QListView):
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
+        self.setModel(PageModel(main["self"]))
+        self.setItemDelegate(PageDelegate(self))
+        # 所有条目同样大小 + 分批布局：上万页时布局和滚动也不会变慢
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(500)
         # 拖拽设置
         self.SetMode()
         self.setIconSize(
             QSize(int(400 * main["self"].zoomsize), int(500 * main["self"].zoomsize)))
         self.ctrlPressed = False
 
-    def SetMode(self, mode=QListWidget.IconMode):
+    def SetMode(self, mode=QListView.IconMode):
         self.setViewMode(mode)
+        self.setMovement(QListView.Static)  # 拖动改变的是模型里的顺序，不是条目坐标
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.InternalMove)  # 设置拖放
@@ -773,9 +1125,38 @@ class ListWidget(QListWidget):
         self.setDefaultDropAction(Qt.MoveAction)
         self.setFlow(QListView.LeftToRight)
 
-    def click(self, item):
-        # QMessageBox.information(self,'ListWidget','你选择了：'+item.text())
-        print(item)
+    def click(self, index):
+        # QMessageBox.information(self,'ListWidget','你选择了：'+index.data())
+        print(index)
+
+    def count(self):
+        return self.model().rowCount()
+
+    def SelectedPages(self):
+        # 选中页面的页码（按显示顺序）
+        model = self.model()
+        rows = sorted(i.row() for i in self.selectionModel().selectedRows())
+        return [main["self"].uidpage[model.order[row]] for row in rows]
+
+    def RowPages(self):
+        # 全部页面的页码（按显示顺序，即拖动排序后的顺序）
+        return [main["self"].uidpage[uid] for uid in self.model().order]
+
+    def dragMoveEvent(self, e):
+        if e.source() is self:
+            e.setDropAction(Qt.MoveAction)
+            e.accept()
+        else:
+            super().dragMoveEvent(e)
+
+    def dropEvent(self, e):
+        if e.source() is not self:
+            return super().dropEvent(e)
+        rows = [i.row() for i in self.selectionModel().selectedRows()]
+        self.model().MoveRows(rows, self.indexAt(e.pos()).row())
+        # 告诉拖动发起方不要再删除源行（移动已经在模型里完成）
+        e.setDropAction(Qt.CopyAction)
+        e.accept()
 
     def dragEnterEvent(self, e: QDragEnterEvent) -> None:
         """（从外部或内部控件）拖拽进入后触发的事件"""
@@ -828,10 +1209,15 @@ class ListWidget(QListWidget):
                 main["self"].zoomsize = main["self"].zoomsize - 0.1
             self.setIconSize(
                 QSize(int(400 * main["self"].zoomsize), int(500 * main["self"].zoomsize)))
+            main["self"].ScheduleThumbs()
             # self.zoomIn(self.zoomsize)
         else:  # if the ctrl key isn't pressed then submiting                   the event to it's super class
             return super().wheelEvent(event)
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        main["self"].ScheduleThumbs()
+
 
 class Window(QWidget):
 
@@ -842,9 +1228,22 @@ class Window(QWidget):
         self.resize(800, 600)
         self.ctrlPressed = False
         self.zoomsize = 1.5
-        self.lwitem = {}
         self.doc = None
         main["self"] = self
+        # 每页的状态：(页面 id, 源文件, 源文件中的页码)，下标即当前页码
+        self.pages = []
+        self.nextuid = 0
+        self.uidpage = {}  # 页面 id -> 当前页码
+        # 缩略图按需渲染：只渲染可视区域附近的页，页面 id -> (占用字节, 缩放, 旋转, QPixmap)，按最近显示排序
+        self.thumbs = OrderedDict()
+        self.thumbbytes = 0
+        self.visibleuids = set()  # 可视区及其附近的页，淘汰时不动（缩小显示时可能超出内存上限）
+        self.thumbtimer = QTimer(self)
+        self.thumbtimer.setSingleShot(True)
+        self.thumbtimer.setInterval(30)
+        self.thumbtimer.timeout.connect(self.UpdateVisibleThumbs)
+        self.renderer = ThumbRenderer()
+        self.renderer.rendered.connect(self.OnThumbRendered, Qt.QueuedConnection)
         # Create pyqt toolbar
         toolBar = QToolBar()
         layout.addWidget(toolBar)
@@ -881,6 +1280,9 @@ class Window(QWidget):
         toolBar.addAction(toolButton14)
         toolBar.actionTriggered[QAction].connect(self.OnClickToolbarButton)
         self.listWidget = ListWidget()
+        self.pagemodel = self.listWidget.model()
+        self.listWidget.verticalScrollBar().valueChanged.connect(self.ScheduleThumbs)
+        self.listWidget.horizontalScrollBar().valueChanged.connect(self.ScheduleThumbs)
         self.setWindowTitle('LPDF 4.8.3')
         # self.listWidget.setWrapping(True)
 
@@ -896,6 +1298,7 @@ class Window(QWidget):
         if o.text() == "保存":
             if self.doc != None:
                 self.doc.saveIncr()
+                self.OnSaved()
                 QMessageBox.question(self, '提示', "已保存", QMessageBox.Yes)
         if o.text() == "另存":
             self.OnReSave()
@@ -906,20 +1309,22 @@ class Window(QWidget):
         if o.text() == "插入":
             self.OnInsterPage()
         if o.text() == "关闭":
-            self.lwitem.clear()
-            self.listWidget.clear()
+            self.ClearPages()
+            self.renderer.Close()
             if self.doc != None:
                 self.doc.close()
                 self.doc = None
-            self.listWidget.update()
+            self.listWidget.viewport().update()
         if o.text() == "排序":
             self.listWidget.SetMode(self.listWidget.ListMode)
             # self.listWidget.setSelectionMode(QAbstractItemView.ExtendedSelection) #设置可多选
             # self.listWidget.setDragDropMode(QAbstractItemView.InternalMove) #设置可拖动排序
             self.listWidget.setIconSize(
                 QSize(int(400 * self.zoomsize), int(500 * self.zoomsize)))
+            self.ScheduleThumbs()
         if o.text() == "阅读":
             self.listWidget.SetMode()
+            self.ScheduleThumbs()
 
         if o.text() == "导出":
             self.outputwindow = OutputOption()
@@ -935,7 +1340,7 @@ class Window(QWidget):
             # ?合并功能 新窗口 拥有调整文件合并顺序的功能
             # ?在一个窗口中显示 文件列表 保存路径
         if o.text() == "优化":
-            if len(self.listWidget.selectedItems()) != 0:
+            if len(self.listWidget.SelectedPages()) != 0:
                 self.optimizewindow = OptimizeWindow()
                 self.optimizewindow.show()
                 self.optimizewindow.LoadFromSelect()
@@ -944,102 +1349,59 @@ class Window(QWidget):
 
     def OnOutPut(self, zoom, mase, savefile):
         if self.doc != None:
-            select = self.listWidget.selectedItems()
             list = []
-            for itm in select:
-                list.append(int(itm.text()) - 1)
-            procbar = ProgressWindow()
+            for pagenum in self.listWidget.SelectedPages():
+                list.append((pagenum, self.doc[pagenum].rotation))
+            # 多进程导出：工作进程读 renderer 的源文件（结构改动后是快照），旋转角度随任务传入
+            procbar = ProgressWindow(cancelable=True)
             procbar.SetRange(0, len(list))
-            RateOfProgress = 0
-            procbar.SetVaule(RateOfProgress)
-            for pagenum in list:
-                page = self.doc[pagenum]
-                mat = fitz.Matrix(zoom, zoom).preRotate(0)
-                pix = page.getPixmap(matrix=mat, alpha=False)
-                imgdata = pix.getImageData(output="png")
-                image_array = np.frombuffer(imgdata, dtype=np.uint8)
-                img_cv = cv2.imdecode(image_array, cv2.IMREAD_ANYCOLOR)
-                tmp = savefile + '/%04d' % pagenum + ".jpg"
-                cv2.imwrite(tmp, img_cv, [cv2.IMWRITE_JPEG_QUALITY, mase])
-                RateOfProgress += 1
+            procbar.SetVaule(0)
+            for RateOfProgress in export_jpegs(self.DocSource(), list, zoom, mase, savefile,
+                                               cancelled=procbar.IsCancelled):
                 procbar.SetVaule(RateOfProgress)
             procbar.close()
 
-    def OnOutZip(self, zoom, mase, savefile):
+    def OnOutZip(self, zoom, mase, savefile, imageonly=False):
         # ?加进度条 -完成
         # ?加入0页面提示无法保存提示 -完成
         # ?新建窗口 将输入信息合并
         if self.doc != None:
-            select = self.listWidget.selectedItems()
+            select = self.listWidget.SelectedPages()
             if len(select) == 0:
                 QMessageBox.question(self, '提示', "未选择需要压缩的页面", QMessageBox.Yes)
                 return
             list = []
-            tmpfilelist = []
-            # ?压缩图片建立在内存不拷贝至硬盘
-            for itm in select:
-                list.append(int(itm.text()) - 1)
-            zippdf = fitz.open()
-            procbar = ProgressWindow()
+            for pagenum in select:
+                list.append((pagenum, self.doc[pagenum].rotation))
+            procbar = ProgressWindow(cancelable=True)
+            if imageonly:
+                # 只缩小超过分辨率上限的嵌入图片，文字和矢量不动
+                for RateOfProgress, total in recompress_images(self.DocSource(), list, 72 * zoom, mase,
+                                                               savefile, cancelled=procbar.IsCancelled):
+                    procbar.SetRange(0, total)
+                    procbar.SetVaule(RateOfProgress)
+                procbar.close()
+                return
+            # 工作进程并行渲染编码，JPEG 直接作为页面图片插入，每批增量写盘
             procbar.SetRange(0, len(list))
-            RateOfProgress = 0
-            procbar.SetVaule(RateOfProgress)
-            for pagenum in list:
-                page = self.doc[pagenum]
-                mat = fitz.Matrix(zoom, zoom).preRotate(0)
-                pix = page.getPixmap(matrix=mat, alpha=False)
-                imgdata = pix.getImageData(output="png")
-                image_array = np.frombuffer(imgdata, dtype=np.uint8)
-                img_cv = cv2.imdecode(image_array, cv2.IMREAD_ANYCOLOR)
-                # 废弃代码
-                # tmpfilename="v:"+str(pagenum)+'.jpg'#tempfile.gettempdir()
-                # tmpfilelist.append(tmpfilename)
-                # cv2.imwrite(tmpfilename, img_cv,[cv2.IMWRITE_JPEG_QUALITY,mase])
-                # 废弃代码
-                jpgimg = cv2.imencode(".jpg", img_cv, [cv2.IMWRITE_JPEG_QUALITY, mase])
-                img = fitz.open("jpg", np.array(jpgimg[1]).tobytes())
-                pdfbyte = img.convert_to_pdf()
-                img.close()
-                doc2 = fitz.open("pdf", pdfbyte)
-                zippdf.insert_pdf(doc2)
-                doc2.close()
-                RateOfProgress += 1
+            procbar.SetVaule(0)
+            for RateOfProgress in compress_pages(self.DocSource(), list, zoom, mase, savefile,
+                                                 cancelled=procbar.IsCancelled):
                 procbar.SetVaule(RateOfProgress)
-            zippdf.ez_save(savefile)
-
-            # 废弃代码
-            # for filepath in tmpfilelist:
-            #    img = fitz.open(filepath)
-            #    pdfbyte = img.convert_to_pdf()
-            #    img.close()
-            #    doc2 = fitz.open("pdf", pdfbyte)
-            #    zippdf.insert_pdf(doc2)
-            #    doc2.close()
-            # if savefile[-4:] == ".pdf":
-            #    zippdf.ez_save(savefile)
-            # else:
-            #    zippdf.ez_save(savefile+".pdf")
-            # for filepath in tmpfilelist:
-            #    os.remove(filepath)
-            # 废弃代码
+            procbar.close()
 
     def OnReSave(self):
         if self.doc != None:
-            select = self.listWidget.selectedItems()
+            select = self.listWidget.SelectedPages()
             savefile = QFileDialog(self, "选择PDF文件", "",
                                    "PDF 文件(*.pdf)").getSaveFileName()[0]
             savedoc = fitz.open()
             if len(select) == 0:
-                for i in range(0, self.listWidget.count()):
-                    itm = self.listWidget.item(i)
-                    savedoc.insert_pdf(self.doc, int(
-                        itm.text()) - 1, int(itm.text()) - 1, -1)
+                for pagenum in self.listWidget.RowPages():
+                    savedoc.insert_pdf(self.doc, pagenum, pagenum, -1)
             else:
-                list = []
-                for itm in select:
-                    list.append(int(itm.text()) - 1)
-                    savedoc.insert_pdf(self.doc, int(
-                        itm.text()) - 1, int(itm.text()) - 1, -1)
+                for pagenum in select:
+                    savedoc.insert_pdf(self.doc, pagenum, pagenum, -1)
             if savefile[-4:] == ".pdf":
                 savedoc.ez_save(savefile)
             else:
@@ -1058,89 +1420,237 @@ class Window(QWidget):
             pdfbyte = img.convert_to_pdf()
             img.close()
             doc2 = fitz.open("pdf", pdfbyte)
+            srcfile = self.renderer.AddTmp(pdfbyte)
         else:
             doc2 = fitz.open(self.insterfile)
-        select = self.listWidget.selectedItems()
-        list = []
-        for itm in select:
-            list.append(int(itm.text()) - 1)
+            srcfile = self.insterfile
+        list = self.listWidget.SelectedPages()
         list.sort()
         if len(list) == 0:
+            start = self.doc.page_count
             self.doc.insert_pdf(doc2)
         else:
+            start = list[0]
             self.doc.insert_pdf(doc2, -1, -1, list[0])
-        self.ReLoad()
+        # 只给新页面加行，原有页面的缩略图保留，后面的页只改页码
+        if start < len(self.pages):
+            row = self.pagemodel.rows[self.pages[start][0]]
+        else:
+            row = self.pagemodel.rowCount()
+        newpages = self.NewPages(srcfile, range(doc2.page_count))
+        self.pages[start:start] = newpages
+        doc2.close()
+        self.Renumber()
+        self.pagemodel.InsertPages(row, [page[0] for page in newpages])
 
     def OnRotatePage(self):
         if self.doc != None:
-            select = self.listWidget.selectedItems()
-            list = []
-            for itm in select:
-                page = self.doc.load_page(int(itm.text()) - 1)
+            for pagenum in self.listWidget.SelectedPages():
+                page = self.doc.load_page(pagenum)
                 page.set_rotation((page.rotation + 90) % 360)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                fmt = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
-                qtimg = QImage(pix.samples, pix.width,
-                               pix.height, pix.stride, fmt)
-                self.lwitem[int(itm.text()) -
-                            1].setIcon(QIcon(QPixmap.fromImage(qtimg)))
+                if self.LoadCachedThumb(page.number, page.rotation):
+                    continue
+                # 旧图先留着，新角度的预览 / 清晰图渲染好后再替换
+                self.RequestThumb(page.number, page.rotation, THUMB_PREVIEW_ZOOM)
+                self.RequestThumb(page.number, page.rotation, THUMB_ZOOM)
 
     def OnDelPage(self):
         if self.doc != None:
-            select = self.listWidget.selectedItems()
-            list = []
-            for itm in select:
-                list.append(int(itm.text()) - 1)
+            list = self.listWidget.SelectedPages()
             list.sort()
             i = 0
             for i in range(0, len(list)):
                 self.doc.delete_page(list[i] - i)
-            self.ReLoad()
+            # 只移除被删的行，其余页面的缩略图保留
+            removed = []
+            for pagenum in list[::-1]:
+                uid = self.pages.pop(pagenum)[0]
+                self.renderer.CancelPage(uid)
+                if uid in self.thumbs:
+                    self.thumbbytes -= self.thumbs.pop(uid)[0]
+                removed.append(uid)
+            self.pagemodel.RemovePages(removed)
+            self.Renumber()
 
     def ReLoad(self):
-        self.lwitem.clear()
-        self.listWidget.clear()
+        self.ClearPages()
         self.OnLoadPages()
 
     def OnOpenFile(self):
         self.openfile = QFileDialog(
             self, "选择PDF文件", "", "PDF 文件(*.pdf)").getOpenFileName()[0]
         if self.openfile != "":
-            self.lwitem.clear()
-            self.listWidget.clear()
+            self.ClearPages()
             print(self.openfile)
             self.doc = fitz.open(self.openfile)
             self.OnLoadPages()
 
     def OnLoadPages(self):
-        procbar = ProgressWindow()
-        procbar.SetRange(0, self.doc.page_count)
-        RateOfProgress = 0
-        procbar.SetVaule(RateOfProgress)
-        for page in self.doc:
-            pix = page.get_pixmap(matrix=fitz.Matrix(1, 1))
-            self.lwitem[page.number] = QListWidgetItem(str(page.number + 1))
-            fmt = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
-            qtimg = QImage(pix.samples, pix.width, pix.height, pix.stride, fmt)
-            self.lwitem[page.number].setIcon(QIcon(QPixmap.fromImage(qtimg)))
-            self.listWidget.addItem(self.lwitem[page.number])
-            RateOfProgress += 1
-            procbar.SetVaule(RateOfProgress)
-        procbar.close()
+        # 先放占位图，缩略图只在页面滚动到可视区域附近时渲染
+        self.renderer.Reset()
+        srcfile = self.doc.name or self.renderer.AddTmp(self.doc.tobytes())
+        self.pages = self.NewPages(srcfile, range(self.doc.page_count))
+        self.Renumber()
+        self.pagemodel.Reset([page[0] for page in self.pages])
+
+    def NewPages(self, srcfile, srcpages):
+        # 每页一个不变的 id：增删页面后页码会变，缩略图和渲染任务都按 id 对应
+        pages = []
+        for srcpage in srcpages:
+            pages.append((self.nextuid, srcfile, srcpage))
+            self.nextuid += 1
+        return pages
+
+    def Renumber(self):
+        # 页面结构变化后重建 页面 id -> 页码 的对应并刷新显示的页码，不重新渲染
+        self.uidpage = {page[0]: pagenum for pagenum, page in enumerate(self.pages)}
+        self.pagemodel.Relabel()
+        self.renderer.Invalidate()
+        self.ScheduleThumbs()
+
+    def OnSaved(self):
+        # 增量保存把当前页面结构写回了原文件：每页改为指向原文件中的当前页码，
+        # 之后的缩略图从保存后的文件渲染，磁盘缓存也按新指纹存放
+        self.renderer.Rewritten(self.doc.name)
+        self.pages = [(uid, self.doc.name, pagenum) for pagenum, (uid, _, _) in enumerate(self.pages)]
+        self.ScheduleThumbs()
+
+    def DocSource(self):
+        # 导出 / 压缩的工作进程需要一个与当前页面结构一致的文件：没有增删过页面就用原文件
+        srcfile = self.pages[0][1] if self.pages else ""
+        for pagenum, page in enumerate(self.pages):
+            if page[1] != srcfile or page[2] != pagenum:
+                return self.renderer.Snapshot(self.doc)
+        return srcfile
+
+    def ClearPages(self):
+        self.pages = []
+        self.uidpage = {}
+        self.pagemodel.Reset([])
+        self.ClearThumbs()
+
+    def ScheduleThumbs(self):
+        # 滚动 / 缩放 / 改变窗口大小时会连续触发，合并成一次更新
+        self.thumbtimer.start()
+
+    def VisibleRows(self):
+        # 按四分之一缩略图的间距在可视区域内取点，只查可见的几十个位置，与总页数无关
+        lw = self.listWidget
+        view = lw.viewport().rect()
+        size = lw.iconSize()
+        found = []
+        for y in range(view.top(), view.bottom() + 1, max(8, size.height() // 4)):
+            for x in range(view.left(), view.right() + 1, max(8, size.width() // 4)):
+                row = lw.indexAt(QPoint(x, y)).row()
+                if row >= 0:
+                    found.append(row)
+        if not found:
+            return []
+        return list(range(min(found), max(found) + 1))
+
+    def UpdateVisibleThumbs(self):
+        if self.doc == None or self.listWidget.count() == 0:
+            return
+        rows = self.VisibleRows()
+        if not rows:
+            return
+        lw = self.listWidget
+        near = list(range(max(0, rows[0] - THUMB_MARGIN), rows[0])) + \
+            list(range(rows[-1] + 1, min(lw.count(), rows[-1] + 1 + THUMB_MARGIN)))
+        want = [self.uidpage[self.pagemodel.order[row]] for row in rows + near]  # 可视的页优先
+        keep = set(self.pages[pagenum][0] for pagenum in want)
+        self.visibleuids = keep
+        self.renderer.CancelExcept(keep)
+        sharpen = []
+        for pagenum in want:
+            uid = self.pages[pagenum][0]
+            rotation = self.doc[pagenum].rotation
+            old = self.thumbs.get(uid)
+            if old is not None:
+                self.thumbs.move_to_end(uid)
+                if old[1] >= THUMB_ZOOM and old[2] == rotation:
+                    continue
+            if self.LoadCachedThumb(pagenum, rotation):
+                continue
+            if old is None:
+                self.RequestThumb(pagenum, rotation, THUMB_PREVIEW_ZOOM)
+            sharpen.append((pagenum, rotation))
+        # 所有预览排在清晰图之前，先让整屏都有内容
+        for pagenum, rotation in sharpen:
+            self.RequestThumb(pagenum, rotation, THUMB_ZOOM)
+        self.EvictThumbs(keep)
+
+    def RequestThumb(self, pagenum, rotation, zoom):
+        uid, srcfile, srcpage = self.pages[pagenum]
+        self.renderer.Request(uid, (srcfile, srcpage), rotation, zoom)
+
+    def OnThumbRendered(self, gen, uid, rotation, zoom, res):
+        if gen != self.renderer.generation:
+            return  # 文档已更换
+        self.renderer.Done((uid, rotation, zoom))
+        pagenum = self.uidpage.get(uid)
+        if res is None or pagenum is None or self.doc[pagenum].rotation != rotation:
+            return  # 页面已删除 / 又被旋转
+        old = self.thumbs.get(uid)
+        if old is not None and old[2] == rotation and old[1] > zoom:
+            return  # 清晰图已先到，不用预览覆盖
+        width, height, stride, samples = res
+        qtimg = QImage(samples, width, height, stride, QImage.Format_RGB888)
+        self.SetThumb(pagenum, rotation, zoom, QPixmap.fromImage(qtimg))
+
+    def LoadCachedThumb(self, pagenum, rotation):
+        uid, srcfile, srcpage = self.pages[pagenum]
+        data = self.renderer.Cached((srcfile, srcpage), rotation, THUMB_ZOOM)
+        if data is None:
+            return False
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data, "JPG"):
+            return False
+        self.SetThumb(pagenum, rotation, THUMB_ZOOM, pixmap)
+        return True
+
+    def SetThumb(self, pagenum, rotation, zoom, pixmap):
+        uid = self.pages[pagenum][0]
+        if uid in self.thumbs:
+            self.thumbbytes -= self.thumbs.pop(uid)[0]
+        cost = pixmap.width() * pixmap.height() * 4
+        self.thumbs[uid] = (cost, zoom, rotation, pixmap)
+        self.thumbbytes += cost
+        self.pagemodel.PageChanged(uid)
+        self.EvictThumbs(self.visibleuids | {uid})
+
+    def ThumbPixmap(self, uid):
+        # 委托绘制时调用：还没有缩略图的页先画占位，并安排一次渲染
+        entry = self.thumbs.get(uid)
+        if entry is None:
+            self.ScheduleThumbs()
+            return None
+        return entry[3]
+
+    def EvictThumbs(self, keep=()):
+        for uid in list(self.thumbs):
+            if self.thumbbytes <= THUMB_BUDGET:
+                break
+            if uid in keep:
+                continue
+            self.thumbbytes -= self.thumbs.pop(uid)[0]
+            self.pagemodel.PageChanged(uid)
+
+    def ClearThumbs(self):
+        self.renderer.Cancel()
+        self.thumbs.clear()
+        self.thumbbytes = 0
+        self.visibleuids = set()
 
     def GetPageToData(self, pagenum):
-        page = self.doc[pagenum]
-        zoom = 1.3
-        mat = fitz.Matrix(zoom, zoom).preRotate(0)
-        pix = page.getPixmap(matrix=mat, alpha=False)
-        imgdata = pix.getImageData(output="png")
-        image_array = np.frombuffer(imgdata, dtype=np.uint8)
-        img_cv = cv2.imdecode(image_array, cv2.IMREAD_ANYCOLOR)
         # jpgimg=cv2.imencode(".jpg",img_cv,[cv2.IMWRITE_JPEG_QUALITY,100])
-        return img_cv
+        return render_bgr(self.doc[pagenum], 1.3)
 
 
-app = QApplication(sys.argv)
-screen = Window()
-screen.show()
-sys.exit(app.exec_())
\ No newline at end of file
+if __name__ == "__main__":
+    # 缩略图用进程池渲染，Windows 下子进程会重新导入本模块，界面只能在这里启动
+    app = QApplication(sys.argv)
+    screen = Window()
+    app.aboutToQuit.connect(screen.renderer.Close)
+    screen.show()
+    sys.exit(app.exec_())
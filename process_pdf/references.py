@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：references.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/20 15:30
+'''
+"""
+从 PDF 参考文献中抽取 DOI / arXiv ID，并批量解析成引用边。
+
+流程：
+    1) 从文末往前找 References / Bibliography 标题，取其后的文本（遇到附录标题截止）
+    2) 正则找出其中的 DOI 与 arXiv ID
+    3) meta_resolver.get_metadata_batch：先查缓存，未命中的按 Crossref filter / arXiv id_list
+       合并查询，300 条参考文献只需要少数几次请求
+    4) 输出紧凑的引用边列表 [(源 key, 目标 key)]，可追加写入 TSV
+
+用法：
+    from meta_cache import MetaCache
+    from references import resolve_references, save_edges
+    cache = MetaCache("meta.mrc")
+    edges, metas = resolve_references("survey.pdf", contact_email="you@example.com", cache=cache)
+    save_edges("citations.tsv", edges)
+    cache.flush()
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from file_hash import quick_fingerprint
+from id_filter import UnresolvableFilter
+from meta_cache import MetaCache
+from meta_resolver import get_metadata_batch, _normalize_doi
+from pdf_meta import extract_full_text, _DOI_RE, _ARXIV_STAMP_RE, _ARXIV_LINK_RE
+
+_REF_HEAD_RE = re.compile(r"^\s*(?:\d+\.?\s*|[IVX]+\.\s*)?(references|bibliography|r\s*eferences|works cited)\s*$",
+                          re.I | re.M)
+_APPENDIX_RE = re.compile(r"^\s*(?:[A-Z]\.?\s+)?(appendix|appendices|supplementary material)\b", re.I | re.M)
+_ARXIV_REF_RE = re.compile(r"\barXiv\s*(?:preprint\s*)?(?:arXiv)?\s*[:\s]\s*(\d{4}\.\d{4,5})(?:v\d+)?", re.I)
+# 行尾是 / - _ 且下一行以小写字母或数字开头（不是新条目的作者名）时才视为 DOI / URL 被断行；
+# 以 "." 结尾的行多半是一条参考文献的结束，不能与下一条拼在一起
+_WRAPPED_RE = re.compile(r"(?<=[/\-_])[ \t]*\n\s*(?=[a-z0-9])")
+
+
+def _reference_text(pages: List[str]) -> str:
+    """返回参考文献部分的文本；找不到标题时退回最后三分之一的页面。"""
+    for i in range(len(pages) - 1, -1, -1):
+        heads = list(_REF_HEAD_RE.finditer(pages[i]))
+        if heads:
+            text = "\n".join([pages[i][heads[-1].end():]] + pages[i + 1:])
+            m = _APPENDIX_RE.search(text)
+            return text[:m.start()] if m else text
+    return "\n".join(pages[len(pages) * 2 // 3:])
+
+
+def _unwrap(text: str) -> str:
+    # 参考文献里的 DOI / URL 经常在行尾被断开
+    text = _WRAPPED_RE.sub("", text)
+    return re.sub(r"\s*\n\s*", " ", text)
+
+
+def find_reference_ids(text: str) -> Tuple[List[str], List[str]]:
+    """从参考文献文本中找出 (DOI 列表, arXiv ID 列表)，保持出现顺序并去重。"""
+    text = _unwrap(text)
+    dois, arxiv = [], []
+    for m in _DOI_RE.finditer(text):
+        d = _normalize_doi(m.group(1).rstrip(").,;"))
+        if d not in dois:
+            dois.append(d)
+    for rx in (_ARXIV_REF_RE, _ARXIV_STAMP_RE, _ARXIV_LINK_RE):
+        for m in rx.finditer(text):
+            if m.group(1) not in arxiv:
+                arxiv.append(m.group(1))
+    return dois, arxiv
+
+
+def extract_reference_ids(pdf_path: str, workers: int = 1, use_layout_cache: bool = False
+                          ) -> Tuple[List[str], List[str]]:
+    pages = [t for _, t in extract_full_text(pdf_path, workers=workers, use_layout_cache=use_layout_cache)]
+    return find_reference_ids(_reference_text(pages))
+
+
+def resolve_references(pdf_path: str, contact_email: Optional[str] = None,
+                       cache: Optional[MetaCache] = None,
+                       unresolvable: Optional[UnresolvableFilter] = None,
+                       source_key: Optional[str] = None, workers: int = 1,
+                       use_layout_cache: bool = False) -> Tuple[List[Tuple[str, str]], Dict[str, Dict[str, Any]]]:
+    """
+    返回 (edges, metas)：
+        edges: [(source_key, 被引文献 key)]，key 与 meta_resolver 缓存一致（"doi:..." / "arxiv:..."）；
+               未能解析的标识符也保留一条边，方便以后补全
+        metas: {key: metadata}，仅包含解析成功的条目
+    source_key: 本文的 key，默认用文件内容指纹 "file:<fingerprint>"
+    use_layout_cache: 顺序提取文本时读写 PDF 旁的逐页版面缓存
+    """
+    dois, arxiv = extract_reference_ids(pdf_path, workers=workers, use_layout_cache=use_layout_cache)
+    metas = get_metadata_batch(dois, arxiv, contact_email=contact_email, cache=cache,
+                               unresolvable=unresolvable)
+    src = source_key or "file:" + quick_fingerprint(pdf_path)
+    edges = []
+    for key in ["doi:" + d for d in dois] + ["arxiv:" + a for a in arxiv]:
+        meta = metas.get(key)
+        # arXiv 论文若已正式发表，用 DOI 作为统一 key，避免同一篇文献出现两个节点
+        if key.startswith("arxiv:") and meta and meta.get("doi"):
+            key = "doi:" + _normalize_doi(meta["doi"])
+        if (src, key) not in edges:
+            edges.append((src, key))
+    return edges, metas
+
+
+def save_edges(path: str, edges: Iterable[Tuple[str, str]]) -> None:
+    """以 "源\\t目标" 每行一条追加写入。"""
+    with open(path, "a", encoding="utf-8") as f:
+        for src, dst in edges:
+            f.write(f"{src}\t{dst}\n")
+
+
+def load_edges(path: str) -> List[Tuple[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [tuple(line.rstrip("\n").split("\t", 1)) for line in f if "\t" in line]
+
+
+if __name__ == "__main__":
+    import sys
+
+    for pdf in sys.argv[1:]:
+        e, m = resolve_references(pdf)
+        print(pdf, len(e), "references,", len(m), "resolved")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# process_pdf 下的模块以脚本方式互相导入（from meta_cache import ...），测试时把目录加入搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
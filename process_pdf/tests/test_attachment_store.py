@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+import batch_import
+from attachment_store import AttachmentStore
+from pdf_meta import MetaResult
+
+
+def _pdf(tmp_path, name="paper.pdf", data=b"%PDF-1.4 test"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_unresolved_result_is_not_reused(tmp_path):
+    path = _pdf(tmp_path)
+    with AttachmentStore(str(tmp_path / "lib")) as store:
+        h = store.add(path, MetaResult(pdf_path=path, title="Guess", confidence=0.0))
+        assert store.result(path, store.record(h)) is None
+        store.add(path, MetaResult(pdf_path=path, title="Real", source="crossref-search", confidence=0.9), h)
+        assert store.result(path, store.record(h)).title == "Real"
+
+
+def test_unresolved_import_is_retried(tmp_path, monkeypatch):
+    path = _pdf(tmp_path)
+    calls = []
+
+    def resolve(pdf_path, hints, *args, **kwargs):
+        calls.append(pdf_path)
+        if len(calls) == 1:
+            return MetaResult(pdf_path=pdf_path, title="", confidence=0.0)  # 如断网
+        return MetaResult(pdf_path=pdf_path, title="Deep learning", source="doi.org/crossref", confidence=1.0)
+
+    monkeypatch.setattr(batch_import, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(batch_import, "_extract_pdf_hints",
+                        lambda p, **kw: {"doi": "10.1038/nature14539", "arxiv_id": None, "title_hint": None})
+    monkeypatch.setattr(batch_import, "_resolve_from_hints", resolve)
+
+    root = str(tmp_path / "lib")
+    for _ in range(2):
+        with AttachmentStore(root) as store:
+            results = list(batch_import.import_pdfs([path], io_workers=1, store=store))
+    assert len(calls) == 2
+    assert results[0].title == "Deep learning"
+
+    with AttachmentStore(root) as store:
+        results = list(batch_import.import_pdfs([path], io_workers=1, store=store))
+    assert len(calls) == 2  # 解析成功后直接复用索引
+    assert results[0].title == "Deep learning"
+
+
+def test_store_hit_records_new_name(tmp_path):
+    path = _pdf(tmp_path)
+    copy = _pdf(tmp_path, "paper (1).pdf")
+    root = str(tmp_path / "lib")
+    with AttachmentStore(root) as store:
+        h = store.add(path, MetaResult(pdf_path=path, title="Deep learning", source="doi.org/crossref",
+                                       confidence=1.0))
+        results = list(batch_import.import_pdfs([copy], io_workers=1, store=store))
+        assert results[0].pdf_path == copy
+        assert store.record(h)["names"] == ["paper.pdf", "paper (1).pdf"]
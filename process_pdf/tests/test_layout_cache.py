@@ -0,0 +1,33 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+from pdf_meta import _TOP_BAND, _extract_pdf_hints
+
+_KEYS = ("doi", "arxiv_id", "title_hint", "year_hint", "tier")
+
+
+def _pdf(tmp_path):
+    path = str(tmp_path / "paper.pdf")
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((72, 90), "Layout Caching for Scanned Papers", fontsize=18)
+    page.insert_text((72, 120), "A. Author, Example University, 2021", fontsize=10)
+    # 跨首页顶部裁剪区下边界的一行：不应算作裁剪区文本
+    page.insert_text((72, _TOP_BAND * 842 + 4), "doi:10.1234/straddle.5678", fontsize=12)
+    page.insert_text((72, 400), "Abstract. Body text of the paper.", fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_cached_hints_match_uncached(tmp_path):
+    path = _pdf(tmp_path)
+    plain = _extract_pdf_hints(path)
+    first = _extract_pdf_hints(path, use_layout_cache=True)   # 分析页面并写缓存
+    second = _extract_pdf_hints(path, use_layout_cache=True)  # 读缓存
+    assert plain["doi"] == "10.1234/straddle.5678"
+    for hints in (first, second):
+        assert {k: hints[k] for k in _KEYS} == {k: plain[k] for k in _KEYS}
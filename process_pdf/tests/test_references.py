@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+from references import find_reference_ids
+
+
+def test_entry_ending_in_period_is_not_glued_to_next_line():
+    text = "[1] LeCun Y. Deep learning. Nature, 2015. doi:10.1038/nature14539.\nVaswani A. Attention is all you need."
+    dois, _ = find_reference_ids(text)
+    assert dois == ["10.1038/nature14539"]
+
+
+def test_next_numbered_entry_is_not_glued():
+    text = "doi:10.1145/3292500.3330701.\n2. Smith J. Another paper."
+    dois, _ = find_reference_ids(text)
+    assert dois == ["10.1145/3292500.3330701"]
+
+
+def test_doi_wrapped_after_slash_is_joined():
+    text = "Nature 521, 436-444. https://doi.org/10.1038/\nnature14539\nVaswani A. Attention."
+    dois, _ = find_reference_ids(text)
+    assert dois == ["10.1038/nature14539"]
+
+
+def test_doi_wrapped_after_hyphen_is_joined():
+    text = "doi:10.1016/j.patcog.2020-\n107332 and more"
+    dois, _ = find_reference_ids(text)
+    assert dois == ["10.1016/j.patcog.2020-107332"]
+
+
+def test_arxiv_url_wrapped_after_slash_is_joined():
+    text = "Available at https://arxiv.org/abs/\n1706.03762"
+    _, arxiv = find_reference_ids(text)
+    assert arxiv == ["1706.03762"]
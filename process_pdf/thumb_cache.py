@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+@Project ：python-note
+@File    ：thumb_cache.py
+@IDE     ：PyCharm
+@Author  ：wei liyu
+@Date    ：2026/10/20 19:10
+'''
+"""
+LPDF 缩略图磁盘缓存：JPEG 压缩后存放，按 文件指纹 / 页码 / 旋转角度 / 缩放 定位。
+
+    <root>/<文件指纹>/<页码>-<旋转>-<缩放x100>.jpg
+
+文件指纹用 file_hash.quick_fingerprint，同一 PDF 换了路径或文件名仍能命中，内容变化后自动失效。
+命中时更新文件修改时间，trim() 按修改时间从旧到新删除，直到总大小不超过上限（LRU）。
+写入用临时文件 + os.replace，多个渲染进程同时写也不会读到半个文件。
+"""
+import os
+from typing import Optional
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_dir() -> str:
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "lpdf", "thumbs")
+
+
+def entry_path(root: str, fingerprint: str, pagenum: int, rotation: int, zoom: float) -> str:
+    return os.path.join(root, fingerprint, "%d-%d-%d.jpg" % (pagenum, rotation, round(zoom * 100)))
+
+
+def get(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # 记录最近使用
+    except OSError:
+        return None
+    return data
+
+
+def put(path: str, data: bytes) -> None:
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        # 缓存只是加速手段，磁盘满 / 无权限时忽略
+        pass
+
+
+def trim(root: str, max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+    """删除最久未使用的缩略图直到总大小不超过 max_bytes，返回删除的文件数。"""
+    entries = []
+    total = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    removed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed